@@ -1,949 +1,1240 @@
-import streamlit as st
-import CoolProp.CoolProp as CP
-from datetime import datetime
-import pytz
-import plotly.graph_objects as go
-import numpy as np
-import scipy.optimize as opt
-import math
-
-# === Configuración inicial ===
-fluidos = {
-    "Agua": "Water",
-    "Aire": "Air",
-    "Dióxido de Carbono": "CO2",
-    "Amoníaco": "Ammonia",
-    "Metano": "Methane",
-    "Etanol": "Ethanol",
-}
-
-fluido_lista_organizada = [
-    "--- Muy usados ---",
-    "Agua", "Aire", "Dióxido de Carbono", "Amoníaco", "Metano", "Oxígeno", "Nitrógeno", "Helio",
-    "--- REFRIGERANTES ---",
-    "R134a", "R22", "R404A", "R407C", "R410A", "R1234yf", "R1234ze(E)", "R600a", "R290",
-    "--- Química / Industria ---",
-    "Acetone", "Ethanol", "Benzene", "Toluene", "o-Xylene", "m-Xylene", "p-Xylene", "SulfurDioxide",
-    "--- Gas ideal / Laboratorio ---",
-    "Hydrogen", "Deuterium", "OrthoHydrogen", "ParaHydrogen", "OrthoDeuterium", "ParaDeuterium",
-    "Neon", "Argon", "Xenon", "Krypton"
-]
-
-for f in fluido_lista_organizada:
-    if not f.startswith("---") and f not in fluidos:
-        fluidos[f] = f
-
-props = {"T": "T", "P": "P", "h": "H", "s": "S", "u": "U", "rho": "D", "v": "D", "x": "Q"}
-to_return = {"T": "T", "P": "P", "h": "H", "s": "S", "u": "U", "rho": "D", "x": "Q"}
-extra_props = ["vel_sonido", "exergia", "mu", "cp", "cv", "k"]
-
-unit_options = {
-    "T": ["°C", "K", "°F"],
-    "P": ["Pa", "kPa", "bar", "atm", "psi"],
-    "h": ["kJ/kg", "J/kg", "BTU/lb"],
-    "s": ["kJ/kgK", "J/kgK", "BTU/lbR"],
-    "u": ["kJ/kg", "J/kg", "BTU/lb"],
-    "rho": ["kg/m3", "lb/ft3"],
-    "v": ["m3/kg", "ft3/lb"],
-    "x": ["-"],
-    "vel_sonido": ["m/s", "ft/s"],
-    "exergia": ["kJ/kg", "BTU/lb"],
-    "mu": ["Pa·s", "cP", "lb/(ft·s)"],
-    "cp": ["kJ/kgK", "J/kgK", "cal/gK", "kcal/kgK"],
-    "cv": ["kJ/kgK", "J/kgK", "cal/gK", "kcal/kgK"],
-    "k": ["-"]
-}
-
-display_names = {
-    "T": "T", "P": "P", "h": "h", "s": "s", "u": "u",
-    "rho": "ρ", "v": "v", "x": "x",
-    "vel_sonido": "a", "exergia": "Ex", "mu": "μ",
-    "cp": "Cp", "cv": "Cv", "k": "k"
-}
-
-preset_systems = {
-    "SI": {"T": "°C", "P": "Pa", "h": "kJ/kg", "s": "kJ/kgK",
-           "u": "kJ/kg", "rho": "kg/m3", "v": "m3/kg", "x": "-",
-           "vel_sonido": "m/s", "exergia": "kJ/kg", "mu": "Pa·s",
-           "cp": "kJ/kgK", "cv": "kJ/kgK", "k": "-"},
-    "Imperial": {"T": "°F", "P": "psi", "h": "BTU/lb", "s": "BTU/lbR",
-                 "u": "BTU/lb", "rho": "lb/ft3", "v": "ft3/lb", "x": "-",
-                 "vel_sonido": "ft/s", "exergia": "BTU/lb", "mu": "lb/(ft·s)",
-                 "cp": "kJ/kgK", "cv": "kJ/kgK", "k": "-"}
-}
-
-input_units = {k: v[0] for k, v in unit_options.items()}
-output_units = {k: v[0] for k, v in unit_options.items()}
-
-T_ref = 15.0
-P_ref = 101325.0
-
-# === Conversiones ===
-def to_SI(prop, val, unit):
-    try:
-        if prop == "T":
-            if unit == "°C": return val + 273.15
-            if unit == "K": return val
-            if unit == "°F": return (val - 32) * 5/9 + 273.15
-        if prop == "P":
-            if unit == "Pa": return val
-            if unit == "kPa": return val * 1000
-            if unit == "bar": return val * 1e5
-            if unit == "atm": return val * 101325
-            if unit == "psi": return val * 6894.757
-        if prop in ["h", "u"]:
-            if unit == "kJ/kg": return val * 1000
-            if unit == "J/kg": return val
-            if unit == "BTU/lb": return val * 2326
-        if prop == "s":
-            if unit == "kJ/kgK": return val * 1000
-            if unit == "J/kgK": return val
-            if unit == "BTU/lbR": return val * 4186.8
-        if prop == "rho":
-            if unit == "kg/m3": return val
-            if unit == "lb/ft3": return val * 16.0185
-        if prop == "v":
-            if unit == "m3/kg": return val
-            if unit == "ft3/lb": return val / 16.0185
-        if prop == "vel_sonido":
-            if unit == "m/s": return val
-            if unit == "ft/s": return val / 0.3048
-        if prop == "exergia":
-            if unit == "kJ/kg": return val * 1000
-            if unit == "BTU/lb": return val * 2326
-        if prop == "mu":
-            if unit == "Pa·s": return val
-            if unit == "cP": return val / 1000
-            if unit == "lb/(ft·s)": return val / 47.8803
-        if prop in ["cp", "cv"]:
-            if unit == "J/kgK": return val
-            if unit == "kJ/kgK": return val * 1000
-            if unit == "cal/gK": return val * 4186.8
-            if unit == "kcal/kgK": return val * 4186.8
-        return val
-    except:
-        return val
-
-def from_SI(prop, val, unit):
-    try:
-        if val is None:
-            return None
-        if prop == "T":
-            if unit == "°C": return val - 273.15
-            if unit == "K": return val
-            if unit == "°F": return val * 9/5 - 459.67
-        if prop == "P":
-            if unit == "Pa": return val
-            if unit == "kPa": return val / 1000
-            if unit == "bar": return val / 1e5
-            if unit == "atm": return val / 101325
-            if unit == "psi": return val / 6894.757
-        if prop in ["h", "u"]:
-            if unit == "kJ/kg": return val / 1000
-            if unit == "J/kg": return val
-            if unit == "BTU/lb": return val / 2326
-        if prop == "s":
-            if unit == "kJ/kgK": return val / 1000
-            if unit == "J/kgK": return val
-            if unit == "BTU/lbR": return val / 4186.8
-        if prop == "rho":
-            if unit == "kg/m3": return val
-            if unit == "lb/ft3": return val / 16.0185
-        if prop == "v":
-            if unit == "m3/kg": return val
-            if unit == "ft3/lb": return val * 16.0185
-        if prop == "vel_sonido":
-            if unit == "m/s": return val
-            if unit == "ft/s": return val * 0.3048
-        if prop == "exergia":
-            if unit == "kJ/kg": return val / 1000
-            if unit == "BTU/lb": return val / 2326
-        if prop == "mu":
-            if unit == "Pa·s": return val
-            if unit == "cP": return val * 1000
-            if unit == "lb/(ft·s)": return val * 47.8803
-        if prop in ["cp", "cv"]:
-            if unit == "J/kgK": return val
-            if unit == "kJ/kgK": return val / 1000
-            if unit == "cal/gK": return val / 4186.8
-            if unit == "kcal/kgK": return val / 4186.8
-        return val
-    except:
-        return val
-
-# === Buscador de bracket para la raíz en presión ===
-def find_pressure_bracket(func, p_min=1e-6, p_max=1e8, n=80):
-    ps = np.logspace(np.log10(max(p_min,1e-12)), np.log10(p_max), n)
-    prev_f = None
-    prev_p = None
-    for p in ps:
-        try:
-            f = func(p)
-            if not math.isfinite(f):
-                prev_f = None
-                prev_p = None
-                continue
-            if prev_f is None:
-                prev_f = f
-                prev_p = p
-                continue
-            if prev_f * f < 0:
-                return prev_p, p
-            prev_f = f
-            prev_p = p
-        except Exception:
-            prev_f = None
-            prev_p = None
-    return None
-
-# === Calcula P a partir de (T,h) or (T,u) ===
-def P_from_T_H_or_U(T_SI, val_SI, fluid, prop="H", dentro_campana=False, fase=None):
-    """
-    Devuelve presión (Pa) para (T, H) o (T, U).
-    Si dentro_campana=True devuelve la presión de saturación en T.
-    Si fase='liquido' o 'vapor', busca en esa fase específica.
-    """
-    try:
-        # si el usuario fuerza dentro de la campana devolvemos la presión de saturación
-        if dentro_campana:
-            return CP.PropsSI("P", "T", T_SI, "Q", 0, fluid)
-        
-        # Calcular valores de saturación para verificar si está en campana
-        try:
-            if prop == "H":
-                h_l = CP.PropsSI("H", "T", T_SI, "Q", 0, fluid)
-                h_v = CP.PropsSI("H", "T", T_SI, "Q", 1, fluid)
-            else:
-                h_l = CP.PropsSI("U", "T", T_SI, "Q", 0, fluid)
-                h_v = CP.PropsSI("U", "T", T_SI, "Q", 1, fluid)
-            
-            # Verificar si los valores de saturación son válidos
-            if h_l is not None and h_v is not None and math.isfinite(h_l) and math.isfinite(h_v):
-                # Determinar mínimo y máximo (puede ser que h_l > h_v para algunos fluidos)
-                h_min = min(h_l, h_v)
-                h_max = max(h_l, h_v)
-                
-                # Si está dentro de la campana, devolver presión de saturación
-                if h_min <= val_SI <= h_max:
-                    return CP.PropsSI("P", "T", T_SI, "Q", 0, fluid)
-                
-                # Si está fuera de la campana, buscar en la fase correspondiente
-                if val_SI < h_min:
-                    # Líquido comprimido
-                    def f_liquido(P):
-                        return CP.PropsSI(prop, "T", T_SI, "P", P, fluid) - val_SI
-                    bracket = find_pressure_bracket(f_liquido, p_min=1e6, p_max=1e9)
-                    if bracket:
-                        p_lo, p_hi = bracket
-                        return opt.brentq(f_liquido, p_lo, p_hi, maxiter=100)
-                
-                else:  # val_SI > h_max
-                    # Vapor sobrecalentado
-                    def f_vapor(P):
-                        return CP.PropsSI(prop, "T", T_SI, "P", P, fluid) - val_SI
-                    bracket = find_pressure_bracket(f_vapor, p_min=1e3, p_max=1e7)
-                    if bracket:
-                        p_lo, p_hi = bracket
-                        return opt.brentq(f_vapor, p_lo, p_hi, maxiter=100)
-                
-                return None
-                
-        except Exception as e:
-            # Si falla el cálculo de saturación, continuar con búsqueda general
-            pass
-
-        # Búsqueda general si no se pudo determinar saturación
-        def f(P):
-            return CP.PropsSI(prop, "T", T_SI, "P", P, fluid) - val_SI
-
-        bracket = find_pressure_bracket(f)
-        if bracket is None:
-            return None
-        p_lo, p_hi = bracket
-        # comprobación final de signos
-        f_lo = f(p_lo); f_hi = f(p_hi)
-        if not (math.isfinite(f_lo) and math.isfinite(f_hi)) or (f_lo * f_hi > 0):
-            return None
-        P_root = opt.brentq(f, p_lo, p_hi, maxiter=100)
-        return P_root
-        
-    except Exception:
-        return None
-
-# === Función para calcular todas las propiedades ===
-def calcular_propiedades(prop1, val1_SI, prop2, val2_SI, fluid):
-    """Calcula todas las propiedades termodinámicas dadas dos propiedades"""
-    results = {}
-    
-    # Calcular propiedades principales
-    for k, v in to_return.items():
-        try:
-            raw = CP.PropsSI(v, props[prop1], val1_SI, props[prop2], val2_SI, fluid)
-            results[k] = from_SI(k, raw, output_units.get(k, output_units["T"]))
-        except Exception:
-            results[k] = None
-    
-    # Calcular propiedades adicionales
-    try:
-        rho_raw = CP.PropsSI("D", props[prop1], val1_SI, props[prop2], val2_SI, fluid)
-        if rho_raw is not None and rho_raw != 0:
-            v_raw = 1.0 / rho_raw
-            results["v"] = from_SI("v", v_raw, output_units.get("v", output_units["v"]))
-        else:
-            results["v"] = None
-    except Exception:
-        results["v"] = None
-    
-    try:
-        a_raw = CP.PropsSI("A", props[prop1], val1_SI, props[prop2], val2_SI, fluid)
-        results["vel_sonido"] = from_SI("vel_sonido", a_raw, output_units.get("vel_sonido", output_units["vel_sonido"]))
-    except Exception:
-        results["vel_sonido"] = None
-    
-    try:
-        h_raw = CP.PropsSI("H", props[prop1], val1_SI, props[prop2], val2_SI, fluid)
-        s_raw = CP.PropsSI("S", props[prop1], val1_SI, props[prop2], val2_SI, fluid)
-        h0 = CP.PropsSI("H", "T", T_ref + 273.15, "P", P_ref, fluid)
-        s0 = CP.PropsSI("S", "T", T_ref + 273.15, "P", P_ref, fluid)
-        ex_raw = (h_raw - h0) - (T_ref + 273.15) * (s_raw - s0)
-        results["exergia"] = from_SI("exergia", ex_raw, output_units.get("exergia", output_units["exergia"]))
-    except Exception:
-        results["exergia"] = None
-    
-    try:
-        mu_raw = CP.PropsSI("V", props[prop1], val1_SI, props[prop2], val2_SI, fluid)
-        results["mu"] = from_SI("mu", mu_raw, output_units.get("mu", output_units["mu"]))
-    except Exception:
-        results["mu"] = None
-    
-    try:
-        cp_raw = CP.PropsSI("Cpmass", props[prop1], val1_SI, props[prop2], val2_SI, fluid)
-        cv_raw = CP.PropsSI("Cvmass", props[prop1], val1_SI, props[prop2], val2_SI, fluid)
-        k_val = None
-        if (cv_raw is not None) and (cv_raw != 0):
-            k_val = cp_raw / cv_raw
-        results["cp"] = from_SI("cp", cp_raw, output_units.get("cp", output_units["cp"])) if cp_raw is not None else None
-        results["cv"] = from_SI("cv", cv_raw, output_units.get("cv", output_units["cv"])) if cv_raw is not None else None
-        results["k"] = k_val
-    except Exception:
-        results["cp"], results["cv"], results["k"] = None, None, None
-    
-    # Determinar estado termodinámico de manera más precisa
-    try:
-        # Obtener propiedades en SI para cálculos precisos
-        T_val = CP.PropsSI("T", props[prop1], val1_SI, props[prop2], val2_SI, fluid)
-        P_val = CP.PropsSI("P", props[prop1], val1_SI, props[prop2], val2_SI, fluid)
-        h_val = CP.PropsSI("H", props[prop1], val1_SI, props[prop2], val2_SI, fluid)
-        
-        # Calcular propiedades de saturación a la presión actual
-        try:
-            T_sat = CP.PropsSI("T", "P", P_val, "Q", 0, fluid)
-            h_l_sat = CP.PropsSI("H", "P", P_val, "Q", 0, fluid)
-            h_v_sat = CP.PropsSI("H", "P", P_val, "Q", 1, fluid)
-            
-            # Tolerancias (ajustables según necesidad)
-            tol_temp = 0.1  # K
-            tol_enth = 100  # J/kg
-            
-            # Determinar el estado basado en comparación con valores de saturación
-            if abs(T_val - T_sat) < tol_temp:
-                # Está en la curva de saturación
-                if results.get("x", 0) == 0.0:
-                    estado = "Líquido saturado"
-                elif results.get("x", 0) == 1.0:
-                    estado = "Vapor saturado"
-                else:
-                    estado = "Mezcla líquido-vapor"
-            else:
-                # Está fuera de la curva de saturación
-                if h_val < h_l_sat - tol_enth:
-                    estado = "Líquido subenfriado"
-                    results["x"] = 0.0  # Forzar x=0 para líquido subenfriado
-                elif h_val > h_v_sat + tol_enth:
-                    estado = "Vapor sobrecalentado"
-                    results["x"] = 1.0  # Forzar x=1 para vapor sobrecalentado
-                else:
-                    # Está dentro de la campana pero no en la curva de saturación
-                    estado = "Mezcla líquido-vapor"
-            
-            results["estado_termodinamico"] = estado
-            
-        except Exception as e:
-            # Si falla el cálculo de saturación a P, intentar a T
-            try:
-                P_sat = CP.PropsSI("P", "T", T_val, "Q", 0, fluid)
-                h_l_sat = CP.PropsSI("H", "T", T_val, "Q", 0, fluid)
-                h_v_sat = CP.PropsSI("H", "T", T_val, "Q", 1, fluid)
-                
-                # Tolerancias
-                tol_pres = 100  # Pa
-                tol_enth = 100  # J/kg
-                
-                if abs(P_val - P_sat) < tol_pres:
-                    # Está en la curva de saturación
-                    if results.get("x", 0) == 0.0:
-                        estado = "Líquido saturado"
-                    elif results.get("x", 0) == 1.0:
-                        estado = "Vapor saturado"
-                    else:
-                        estado = "Mezcla líquido-vapor"
-                else:
-                    # Está fuera de la curva de saturación
-                    if h_val < h_l_sat - tol_enth:
-                        estado = "Líquido subenfriado"
-                        results["x"] = 0.0
-                    elif h_val > h_v_sat + tol_enth:
-                        estado = "Vapor sobrecalentado"
-                        results["x"] = 1.0
-                    else:
-                        # Está dentro de la campana pero no en la curva de saturación
-                        estado = "Mezcla líquido-vapor"
-                
-                results["estado_termodinamico"] = estado
-                
-            except Exception as e2:
-                # Si ambos métodos fallan, usar método simple basado en calidad
-                if results.get("x", 0) == 0.0:
-                    estado = "Líquido"
-                elif results.get("x", 0) == 1.0:
-                    estado = "Vapor"
-                else:
-                    estado = "Mezcla líquido-vapor"
-                results["estado_termodinamico"] = estado
-                
-    except Exception as e:
-        # Si falla completamente, no agregar información de estado
-        print(f"Error determinando estado termodinámico: {e}")
-        pass
-    
-    return results
-    
-# === Streamlit UI ===
-st.title("Atlas Termodinámico Digital (ATD)")
-st.subheader("Calculadora de propiedades termodinámicas")
-
-# Fluido
-fluido_seleccionado = st.selectbox("Selecciona el fluido", fluido_lista_organizada,
-                                   index=fluido_lista_organizada.index("Agua"))
-if fluido_seleccionado.startswith("---"):
-    fluido_seleccionado = "Agua"
-fluido_cp = fluidos[fluido_seleccionado]
-
-# Presets
-st.sidebar.header("Configuración rápida")
-preset_choice = st.sidebar.radio("Sistema de unidades", ["Ninguno", "SI", "Imperial"])
-if preset_choice != "Ninguno":
-    input_units.update(preset_systems[preset_choice])
-    output_units.update(preset_systems[preset_choice])
-
-# Unidades (sidebar)
-st.sidebar.header("Configuración de unidades")
-st.sidebar.subheader("Entrada")
-for p in list(props.keys()) + extra_props:
-    input_units[p] = st.sidebar.selectbox(f"Unidad ingreso {display_names.get(p,p)}",
-                                          unit_options[p], index=unit_options[p].index(input_units.get(p, unit_options[p][0])))
-st.sidebar.subheader("Salida")
-for p in list(props.keys()) + extra_props:
-    output_units[p] = st.sidebar.selectbox(f"Unidad salida {display_names.get(p,p)}",
-                                           unit_options[p], index=unit_options[p].index(output_units.get(p, unit_options[p][0])))
-
-# Estado referencia exergía
-st.sidebar.header("Estado referencia exergía")
-T_ref = st.sidebar.number_input("Temperatura referencia [°C]", value=T_ref)
-P_ref = st.sidebar.number_input("Presión referencia [Pa]", value=P_ref)
-
-# Propiedades independientes (usar text_input para permitir coma)
-st.subheader("Propiedades independientes")
-prop1 = st.selectbox("Propiedad 1", list(props.keys()), index=0)
-val1_str = st.text_input(f"Valor {display_names.get(prop1, prop1)} ({input_units[prop1]})", value="25.0")
-try:
-    val1 = float(val1_str.replace(',', '.'))
-except:
-    val1 = 0.0
-
-prop2 = st.selectbox("Propiedad 2", list(props.keys()), index=1)
-val2_str = st.text_input(f"Valor {display_names.get(prop2, prop2)} ({input_units[prop2]})", value="101325.0")
-try:
-    val2 = float(val2_str.replace(',', '.'))
-except:
-    val2 = 0.0
-
-# Checkbox "dentro de la campana" solo visible si entras por T & H o T & U
-dentro_campana_checkbox = False
-mostrar_opciones_fase = False
-if ("T" in (prop1, prop2)) and (("h" in (prop1, prop2)) or ("u" in (prop1, prop2))):
-    dentro_campana_checkbox = st.checkbox("Dentro de la campana?", value=False)
-    if not dentro_campana_checkbox:
-        mostrar_opciones_fase = st.checkbox("No estoy seguro, mostrar todas las opciones", value=False)
-
-# Inicializar historial
-if 'historial' not in st.session_state:
-    st.session_state['historial'] = []
-
-# Zona horaria
-tz = pytz.timezone("America/Argentina/Buenos_Aires")
-
-# Botón calcular
-if st.button("Calcular"):
-    # Convertir valores a SI
-    val1_SI = to_SI(prop1, val1, input_units.get(prop1, "°C"))
-    val2_SI = to_SI(prop2, val2, input_units.get(prop2, "Pa"))
-    
-    # Caso especial: T y h o T y u
-    if ("T" in (prop1, prop2)) and (("h" in (prop1, prop2)) or ("u" in (prop1, prop2))):
-        if prop1 == "T":
-            T_SI = val1_SI
-            prop_HU = prop2
-            val_HU_SI = val2_SI
-        else:
-            T_SI = val2_SI
-            prop_HU = prop1
-            val_HU_SI = val1_SI
-        
-        prop_for_func = "H" if prop_HU == "h" else "U"
-        
-        if dentro_campana_checkbox:
-            # Dentro de la campana: usar P y h (o P y u)
-            P_guess = P_from_T_H_or_U(T_SI, val_HU_SI, fluido_cp, prop=prop_for_func, dentro_campana=True)
-            if P_guess is not None:
-                results = calcular_propiedades("P", P_guess, prop_HU, val_HU_SI, fluido_cp)
-                st.subheader("Resultados (Dentro de la campana)")
-                if "estado_termodinamico" in results:
-                    st.info(f"**Estado termodinámico:** {results['estado_termodinamico']}")
-                
-                for k, v in results.items():
-                    if k != "estado_termodinamico":
-                        if v is not None:
-                            unit = output_units.get(k, "")
-                            if isinstance(v, (int, float)) and math.isfinite(v):
-                                st.write(f"**{display_names.get(k,k)}** = {v:.5g} {unit}")
-                            else:
-                                st.write(f"**{display_names.get(k,k)}**: No disponible")
-                        else:
-                            st.write(f"**{display_names.get(k,k)}**: No disponible")
-                
-                # Guardar en historial
-                if len(st.session_state['historial']) >= 20:
-                    st.session_state['historial'].pop(0)
-                st.session_state['historial'].append({
-                    "fecha": datetime.now(tz).strftime("%d/%m/%Y %H:%M:%S"),
-                    "entrada": {prop1: val1, prop2: val2},
-                    "resultado": results
-                })
-            else:
-                st.error("No se pudo encontrar una presión válida para los valores dados")
-        
-        elif mostrar_opciones_fase:
-            # Mostrar ambas opciones (líquido y vapor)
-            st.subheader("Múltiples soluciones posibles")
-            st.info("Para los valores ingresados, existen dos estados posibles:")
-            
-            # Intentar líquido comprimido
-            P_liq = P_from_T_H_or_U(T_SI, val_HU_SI, fluido_cp, prop=prop_for_func, fase='liquido')
-            results_liq = None
-            if P_liq is not None:
-                results_liq = calcular_propiedades("T", T_SI, "P", P_liq, fluido_cp)
-                st.subheader("Opción 1: Líquido comprimido")
-                if "estado_termodinamico" in results_liq:
-                    st.info(f"**Estado termodinámico:** {results_liq['estado_termodinamico']}")
-                
-                for k, v in results_liq.items():
-                    if k != "estado_termodinamico":
-                        if v is not None:
-                            unit = output_units.get(k, "")
-                            if isinstance(v, (int, float)) and math.isfinite(v):
-                                st.write(f"**{display_names.get(k,k)}** = {v:.5g} {unit}")
-                            else:
-                                st.write(f"**{display_names.get(k,k)}**: No disponible")
-                        else:
-                            st.write(f"**{display_names.get(k,k)}**: No disponible")
-
-            # Intentar vapor sobrecalentado
-            P_vap = P_from_T_H_or_U(T_SI, val_HU_SI, fluido_cp, prop=prop_for_func, fase='vapor')
-            results_vap = None
-            if P_vap is not None:
-                results_vap = calcular_propiedades("T", T_SI, "P", P_vap, fluido_cp)
-                st.subheader("Opción 2: Vapor sobrecalentado")
-                if "estado_termodinamico" in results_vap:
-                    st.info(f"**Estado termodinámico:** {results_vap['estado_termodinamico']}")
-                
-                for k, v in results_vap.items():
-                    if k != "estado_termodinamico":
-                        if v is not None:
-                            unit = output_units.get(k, "")
-                            if isinstance(v, (int, float)) and math.isfinite(v):
-                                st.write(f"**{display_names.get(k,k)}** = {v:.5g} {unit}")
-                            else:
-                                st.write(f"**{display_names.get(k,k)}**: No disponible")
-                        else:
-                            st.write(f"**{display_names.get(k,k)}**: No disponible")
-            
-            # Mostrar advertencia siempre (incluso si hay resultados)
-            st.warning("""
-            **💡 Nota importante sobre T y h / T y u:**
-            Para una misma temperatura y entalpía (o energía interna) pueden existir **dos estados diferentes**:
-            - **Líquido comprimido** (alta presión)
-            - **Vapor sobrecalentado** (baja presión)
-            
-            Si los resultados no coinciden con lo esperado, prueba marcando la opción 'Dentro de la campana?' 
-            o verifica que los valores ingresados sean consistentes.
-            """)
-            
-            # Verificar si ambas opciones están vacías o no disponibles
-            liq_todos_none = results_liq is None or all(v is None for v in results_liq.values() if v is not None)
-            vap_todos_none = results_vap is None or all(v is None for v in results_vap.values() if v is not None)
-            
-            if liq_todos_none and vap_todos_none:
-                st.warning("""
-                **🔍 Situación especial:**
-                Ambas opciones aparecen como 'No disponible', lo que indica que los valores ingresados 
-                muy probablemente corresponden a un estado **dentro de la campana de saturación**.
-                
-                **Solución inmediata:** Marca 'Dentro de la campana?' y vuelve a calcular.
-                """)
-            elif P_liq is None and P_vap is None:
-                st.error("No se encontraron soluciones para los valores dados")
-        
-        else:
-            # Búsqueda automática (intenta encontrar una solución)
-            P_guess = P_from_T_H_or_U(T_SI, val_HU_SI, fluido_cp, prop=prop_for_func)
-            
-            if isinstance(P_guess, dict):
-                # Múltiples soluciones encontradas
-                st.warning("Se encontraron múltiples soluciones. Por favor selecciona una opción:")
-                
-                if 'liquido' in P_guess:
-                    results_liq = calcular_propiedades("T", T_SI, "P", P_guess['liquido'], fluido_cp)
-                    st.subheader("Opción 1: Líquido comprimido")
-                    if "estado_termodinamico" in results_liq:
-                        st.info(f"**Estado termodinámico:** {results_liq['estado_termodinamico']}")
-                    
-                    for k, v in results_liq.items():
-                        if k != "estado_termodinamico":
-                            if v is not None:
-                                unit = output_units.get(k, "")
-                                if isinstance(v, (int, float)) and math.isfinite(v):
-                                    st.write(f"**{display_names.get(k,k)}** = {v:.5g} {unit}")
-                                else:
-                                    st.write(f"**{display_names.get(k,k)}**: No disponible")
-                            else:
-                                st.write(f"**{display_names.get(k,k)}**: No disponible")
-                
-                if 'vapor' in P_guess:
-                    results_vap = calcular_propiedades("T", T_SI, "P", P_guess['vapor'], fluido_cp)
-                    st.subheader("Opción 2: Vapor sobrecalentado")
-                    if "estado_termodinamico" in results_vap:
-                        st.info(f"**Estado termodinámico:** {results_vap['estado_termodinamico']}")
-                    
-                    for k, v in results_vap.items():
-                        if k != "estado_termodinamico":
-                            if v is not None:
-                                unit = output_units.get(k, "")
-                                if isinstance(v, (int, float)) and math.isfinite(v):
-                                    st.write(f"**{display_names.get(k,k)}** = {v:.5g} {unit}")
-                                else:
-                                    st.write(f"**{display_names.get(k,k)}**: No disponible")
-                            else:
-                                st.write(f"**{display_names.get(k,k)}**: No disponible")
-                
-                st.info("Marca 'No estoy seguro, mostrar todas las opciones' para ver ambas siempre")
-            
-            elif P_guess is not None:
-                # Una sola solución encontrada
-                results = calcular_propiedades("T", T_SI, "P", P_guess, fluido_cp)
-                st.subheader("Resultados")
-                if "estado_termodinamico" in results:
-                    st.info(f"**Estado termodinámico:** {results['estado_termodinamico']}")
-                
-                for k, v in results.items():
-                    if k != "estado_termodinamico":
-                        if v is not None:
-                            unit = output_units.get(k, "")
-                            if isinstance(v, (int, float)) and math.isfinite(v):
-                                st.write(f"**{display_names.get(k,k)}** = {v:.5g} {unit}")
-                            else:
-                                st.write(f"**{display_names.get(k,k)}**: No disponible")
-                        else:
-                            st.write(f"**{display_names.get(k,k)}**: No disponible")
-                
-                # Guardar en historial
-                if len(st.session_state['historial']) >= 20:
-                    st.session_state['historial'].pop(0)
-                st.session_state['historial'].append({
-                    "fecha": datetime.now(tz).strftime("%d/%m/%Y %H:%M:%S"),
-                    "entrada": {prop1: val1, prop2: val2},
-                    "resultado": results
-                })
-            else:
-                st.error("No se pudo encontrar una presión válida para los valores dados")
-    
-    # Caso general: otras combinaciones de propiedades
-    else:
-        # Usar CoolProp directamente
-        results = calcular_propiedades(prop1, val1_SI, prop2, val2_SI, fluido_cp)
-        
-        # Mostrar resultados
-        st.subheader("Resultados")
-        if "estado_termodinamico" in results:
-            # Color diferente según el estado
-            estado = results["estado_termodinamico"]
-            if estado == "Líquido subenfriado":
-                st.info(f"**Estado termodinámico:** {estado} 💧")
-            elif estado == "Vapor sobrecalentado":
-                st.info(f"**Estado termodinámico:** {estado} 🔥")
-            elif estado == "Líquido saturado":
-                st.info(f"**Estado termodinámico:** {estado} 💧")
-            elif estado == "Vapor saturado":
-                st.info(f"**Estado termodinámico:** {estado} 🔥")
-            elif "Mezcla" in estado:
-                st.info(f"**Estado termodinámico:** {estado} 💧🔥")
-            else:
-                st.info(f"**Estado termodinámico:** {estado}")
-        
-        for k, v in results.items():
-            if k != "estado_termodinamico":
-                if v is not None and isinstance(v, (int, float)) and math.isfinite(v):
-                    unit = output_units.get(k, "")
-                    st.write(f"**{display_names.get(k,k)}** = {v:.5g} {unit}")
-                else:
-                    st.write(f"**{display_names.get(k,k)}**: No disponible")
-        
-        # Guardar en historial
-        if len(st.session_state['historial']) >= 20:
-            st.session_state['historial'].pop(0)
-        st.session_state['historial'].append({
-            "fecha": datetime.now(tz).strftime("%d/%m/%Y %H:%M:%S"),
-            "entrada": {prop1: val1, prop2: val2},
-            "resultado": results
-        })
-
-# Historial
-hist = st.session_state.get('historial', [])
-if hist:
-    with st.expander("Mostrar Historial"):
-        max_index = len(hist) - 1
-        index = st.slider("Selecciona cálculo", 0, max_index, max_index, key="slider_historial") if len(hist) > 1 else 0
-        
-        # Botones para borrar puntos específicos
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("🗑️ Borrar este punto", key="borrar_individual"):
-                del st.session_state['historial'][index]
-                st.rerun()
-        with col2:
-            if st.button("🗑️ Borrar todos los puntos", key="borrar_todos"):
-                st.session_state['historial'] = []
-                st.rerun()
-        
-        st.write(f"**Cálculo {index+1} ({hist[index]['fecha']})**")
-        st.write("**Entradas:**")
-        for prop, val in hist[index]["entrada"].items():
-            st.write(f"{display_names.get(prop, prop)} = {val} {input_units[prop]}")
-        st.write("**Resultados:**")
-        for k, v in hist[index]["resultado"].items():
-            if v is not None:
-                unit = output_units.get(k, "")
-                if isinstance(v, (int, float)) and math.isfinite(v):
-                    st.write(f"**{display_names.get(k,k)}** = {v:.5g} {unit}")
-                else:
-                    st.write(f"**{display_names.get(k,k)}**: No disponible")
-            else:
-                st.write(f"**{display_names.get(k,k)}**: No disponible")
-
-# === Gráfico interactivo plegable ===
-with st.expander("Mostrar Gráfico"):
-    grafico_tipo = st.selectbox("Selecciona diagrama", ["T vs S", "P vs v"])
-    fig = go.Figure()
-    try:
-        fluid = fluido_cp
-        T_triple = CP.PropsSI('Ttriple', fluid)
-        T_crit = CP.PropsSI('Tcrit', fluid)
-        if (T_triple is None) or (T_crit is None) or (not np.isfinite(T_triple)) or (not np.isfinite(T_crit)):
-            T_triple = 273.15 * 0.5
-            T_crit = 650.0
-        T_vals = np.linspace(T_triple + 0.01, T_crit - 0.01, 200)
-
-        if grafico_tipo == "T vs S":
-            S_liq = []
-            S_vap = []
-            T_plot = [from_SI("T", T, output_units["T"]) for T in T_vals]
-            for T in T_vals:
-                try:
-                    S_liq.append(CP.PropsSI('S', 'T', T, 'Q', 0, fluid))
-                except Exception:
-                    S_liq.append(np.nan)
-                try:
-                    S_vap.append(CP.PropsSI('S', 'T', T, 'Q', 1, fluid))
-                except Exception:
-                    S_vap.append(np.nan)
-            S_liq_plot = [from_SI("s", s, output_units["s"]) if (s is not None and np.isfinite(s)) else None for s in S_liq]
-            S_vap_plot = [from_SI("s", s, output_units["s"]) if (s is not None and np.isfinite(s)) else None for s in S_vap]
-            S_liq_x = [s for s in S_liq_plot if s is not None]
-            S_liq_y = [T_plot[i] for i,s in enumerate(S_liq_plot) if s is not None]
-            S_vap_x = [s for s in S_vap_plot if s is not None]
-            S_vap_y = [T_plot[i] for i,s in enumerate(S_vap_plot) if s is not None]
-
-            fig.add_trace(go.Scatter(x=S_liq_x, y=S_liq_y, mode='lines', name="Líquido saturado"))
-            fig.add_trace(go.Scatter(x=S_vap_x, y=S_vap_y, mode='lines', name="Vapor saturado"))
-            fig.update_layout(xaxis_title=f"S ({output_units['s']})", yaxis_title=f"T ({output_units['T']})")
-
-        else:  # P vs v
-            P_liq = []
-            P_vap = []
-            v_liq = []
-            v_vap = []
-            for T in T_vals:
-                try:
-                    P_liq.append(CP.PropsSI('P', 'T', T, 'Q', 0, fluid))
-                except Exception:
-                    P_liq.append(np.nan)
-                try:
-                    P_vap.append(CP.PropsSI('P', 'T', T, 'Q', 1, fluid))
-                except Exception:
-                    P_vap.append(np.nan)
-                try:
-                    d_liq = CP.PropsSI('D', 'T', T, 'Q', 0, fluid)
-                    v_liq.append(1.0/d_liq if (d_liq is not None and d_liq != 0) else np.nan)
-                except Exception:
-                    v_liq.append(np.nan)
-                try:
-                    d_vap = CP.PropsSI('D', 'T', T, 'Q', 1, fluid)
-                    v_vap.append(1.0/d_vap if (d_vap is not None and d_vap != 0) else np.nan)
-                except Exception:
-                    v_vap.append(np.nan)
-
-            P_liq_plot = [from_SI("P", p, output_units["P"]) if (p is not None and np.isfinite(p)) else None for p in P_liq]
-            P_vap_plot = [from_SI("P", p, output_units["P"]) if (p is not None and np.isfinite(p)) else None for p in P_vap]
-            v_liq_plot = [from_SI("v", v, output_units["v"]) if (v is not None and np.isfinite(v)) else None for v in v_liq]
-            v_vap_plot = [from_SI("v", v, output_units["v"]) if (v is not None and np.isfinite(v)) else None for v in v_vap]
-
-            v_liq_x = [v for v in v_liq_plot if v is not None]
-            P_liq_y = [P_liq_plot[i] for i,v in enumerate(v_liq_plot) if v is not None]
-            v_vap_x = [v for v in v_vap_plot if v is not None]
-            P_vap_y = [P_vap_plot[i] for i,v in enumerate(v_vap_plot) if v is not None]
-
-            fig.add_trace(go.Scatter(x=v_liq_x, y=P_liq_y, mode='lines', name="Líquido saturado"))
-            fig.add_trace(go.Scatter(x=v_vap_x, y=P_vap_y, mode='lines', name="Vapor saturado"))
-            fig.update_layout(xaxis_title=f"v ({output_units['v']})", yaxis_title=f"P ({output_units['P']})")
-
-        # Filtrar puntos válidos del historial y separar por estado termodinámico
-        puntos_liquido_sub = []
-        puntos_vapor_sup = []
-        puntos_mezcla = []
-        puntos_saturado = []
-        otros_puntos = []
-        
-        # Lista para todos los puntos en orden (para las flechas)
-        todos_los_puntos = []
-
-        for i, h in enumerate(hist):
-            try:
-                if grafico_tipo == "T vs S":
-                    x_val = h["resultado"].get("s")
-                    y_val = h["resultado"].get("T")
-                else:  # P vs v
-                    x_val = h["resultado"].get("v")
-                    y_val = h["resultado"].get("P")
-                
-                # Verificar que los valores son numéricos y finitos
-                if (x_val is not None and y_val is not None and 
-                    isinstance(x_val, (int, float)) and isinstance(y_val, (int, float)) and
-                    math.isfinite(x_val) and math.isfinite(y_val)):
-                    
-                    # Verificar adicionalmente que no sean valores extremos
-                    if (abs(x_val) < 1e10 and abs(y_val) < 1e10):
-                        estado = h["resultado"].get("estado_termodinamico", "")
-                        punto_info = (x_val, y_val, i)
-                        
-                        # Agregar a la lista de todos los puntos
-                        todos_los_puntos.append(punto_info)
-                        
-                        if estado == "Líquido subenfriado":
-                            puntos_liquido_sub.append(punto_info)
-                        elif estado == "Vapor sobrecalentado":
-                            puntos_vapor_sup.append(punto_info)
-                        elif estado == "Mezcla líquido-vapor":
-                            puntos_mezcla.append(punto_info)
-                        elif estado == "Líquido saturado" or estado == "Vapor saturado":
-                            puntos_saturado.append(punto_info)
-                        else:
-                            otros_puntos.append(punto_info)
-                            
-            except (TypeError, ValueError):
-                continue
-
-        # Crear trazas para cada estado termodinámico
-        if puntos_liquido_sub:
-            x_vals, y_vals, indices = zip(*puntos_liquido_sub)
-            fig.add_trace(go.Scatter(
-                x=x_vals, y=y_vals, mode='markers+text', text=[str(i+1) for i in indices],
-                textposition="top right", marker=dict(size=8, color='blue'), name="Líquido subenfriado"
-            ))
-
-        if puntos_vapor_sup:
-            x_vals, y_vals, indices = zip(*puntos_vapor_sup)
-            fig.add_trace(go.Scatter(
-                x=x_vals, y=y_vals, mode='markers+text', text=[str(i+1) for i in indices],
-                textposition="top right", marker=dict(size=8, color='red'), name="Vapor sobrecalentado"
-            ))
-
-        if puntos_mezcla:
-            x_vals, y_vals, indices = zip(*puntos_mezcla)
-            fig.add_trace(go.Scatter(
-                x=x_vals, y=y_vals, mode='markers+text', text=[str(i+1) for i in indices],
-                textposition="top right", marker=dict(size=8, color='green'), name="Mezcla"
-            ))
-
-        if puntos_saturado:
-            x_vals, y_vals, indices = zip(*puntos_saturado)
-            fig.add_trace(go.Scatter(
-                x=x_vals, y=y_vals, mode='markers+text', text=[str(i+1) for i in indices],
-                textposition="top right", marker=dict(size=8, color='orange'), name="Saturado"
-            ))
-
-        if otros_puntos:
-            x_vals, y_vals, indices = zip(*otros_puntos)
-            fig.add_trace(go.Scatter(
-                x=x_vals, y=y_vals, mode='markers+text', text=[str(i+1) for i in indices],
-                textposition="top right", marker=dict(size=8, color='gray'), name="Otros"
-            ))
-
-        # Dibujar flechas conectando los puntos en orden
-        if len(todos_los_puntos) > 1:
-            # Ordenar puntos por índice (orden en el historial)
-            todos_los_puntos.sort(key=lambda x: x[2])
-            
-            for i in range(len(todos_los_puntos)-1):
-                x1, y1, idx1 = todos_los_puntos[i]
-                x2, y2, idx2 = todos_los_puntos[i+1]
-                
-                fig.add_annotation(
-                    x=x2, y=y2,
-                    ax=x1, ay=y1,
-                    xref="x", yref="y",
-                    axref="x", ayref="y",
-                    showarrow=True,
-                    arrowhead=3,
-                    arrowsize=1,
-                    arrowwidth=1.5,
-                    arrowcolor="orange"
-                )
-            
-            # Añadir traza invisible para la leyenda de flechas
-            fig.add_trace(go.Scatter(
-                x=[None], y=[None],
-                mode='lines',
-                line=dict(color='purple', width=2),
-                name="Secuencia de cálculos"
-            ))
-
-    except Exception as e:
-        st.write("No se pudo generar la curva de saturación:", e)
-
-    st.plotly_chart(fig, use_container_width=True)
-    
-# === Sección de contacto plegable ===
-with st.expander("Contacto"):
-    st.write("**Creador:** Greco Agustin")
-    st.write("**Contacto:** pvt.student657@passfwd.com")
-    st.markdown("###### Si encuentra algún bug, error o inconsistencia en los valores, o tiene sugerencias para mejorar la aplicación, por favor contacte al correo indicado para realizar la corrección.")
+import streamlit as st
+from datetime import datetime
+import pytz
+import numpy as np
+import math
+import os
+import threading
+import time
+
+import inversion
+import mezclas
+import pool_estados
+import propiedades
+from propiedades import (props, extra_props, salidas_derivadas,
+                         salidas_disponibles, salidas_por_defecto)
+
+# CoolProp y plotly se importan dentro de las funciones que los usan:
+# así la primera carga de la página no espera por ellos y el precalentamiento
+# en segundo plano carga CoolProp mientras el usuario completa los datos.
+
+# === Configuración inicial ===
+fluidos = {
+    "Agua": "Water",
+    "Aire": "Air",
+    "Dióxido de Carbono": "CO2",
+    "Amoníaco": "Ammonia",
+    "Metano": "Methane",
+    "Etanol": "Ethanol",
+}
+
+fluido_lista_organizada = [
+    "--- Muy usados ---",
+    "Agua", "Aire", "Dióxido de Carbono", "Amoníaco", "Metano", "Oxígeno", "Nitrógeno", "Helio",
+    "--- REFRIGERANTES ---",
+    "R134a", "R22", "R404A", "R407C", "R410A", "R1234yf", "R1234ze(E)", "R600a", "R290",
+    "--- Química / Industria ---",
+    "Acetone", "Ethanol", "Benzene", "Toluene", "o-Xylene", "m-Xylene", "p-Xylene", "SulfurDioxide",
+    "--- Gas ideal / Laboratorio ---",
+    "Hydrogen", "Deuterium", "OrthoHydrogen", "ParaHydrogen", "OrthoDeuterium", "ParaDeuterium",
+    "Neon", "Argon", "Xenon", "Krypton",
+    "--- Mezclas ---",
+    *mezclas.mezclas_predefinidas, "Mezcla personalizada"
+]
+
+for nombre, composicion in mezclas.mezclas_predefinidas.items():
+    fluidos[nombre] = mezclas.nombre_mezcla(composicion)
+
+for f in fluido_lista_organizada:
+    if not f.startswith("---") and f not in fluidos and f != "Mezcla personalizada":
+        fluidos[f] = f
+
+unit_options = {
+    "T": ["°C", "K", "°F"],
+    "P": ["Pa", "kPa", "bar", "atm", "psi"],
+    "h": ["kJ/kg", "J/kg", "BTU/lb"],
+    "s": ["kJ/kgK", "J/kgK", "BTU/lbR"],
+    "u": ["kJ/kg", "J/kg", "BTU/lb"],
+    "rho": ["kg/m3", "lb/ft3"],
+    "v": ["m3/kg", "ft3/lb"],
+    "x": ["-"],
+    "vel_sonido": ["m/s", "ft/s"],
+    "exergia": ["kJ/kg", "BTU/lb"],
+    "mu": ["Pa·s", "cP", "lb/(ft·s)"],
+    "cp": ["kJ/kgK", "J/kgK", "cal/gK", "kcal/kgK"],
+    "cv": ["kJ/kgK", "J/kgK", "cal/gK", "kcal/kgK"],
+    "k": ["-"],
+    "cond": ["W/mK", "mW/mK", "BTU/hftF"],
+    "Pr": ["-"],
+    "sigma": ["N/m", "mN/m", "lbf/ft"],
+    "kappa_T": ["1/Pa", "1/kPa", "1/bar", "1/psi"],
+    "beta": ["1/K", "1/°F"],
+    "mu_JT": ["K/Pa", "K/bar", "K/MPa", "°F/psi"],
+    "dhdP_T": ["m3/kg", "kJ/(kg·bar)"],
+    "Z": ["-"]
+}
+
+display_names = {
+    "T": "T", "P": "P", "h": "h", "s": "s", "u": "u",
+    "rho": "ρ", "v": "v", "x": "x",
+    "vel_sonido": "a", "exergia": "Ex", "mu": "μ",
+    "cp": "Cp", "cv": "Cv", "k": "k",
+    "cond": "λ", "Pr": "Pr", "sigma": "σ",
+    "kappa_T": "κT", "beta": "β", "mu_JT": "μJT", "dhdP_T": "(∂h/∂P)T", "Z": "Z"
+}
+
+preset_systems = {
+    "SI": {"T": "°C", "P": "Pa", "h": "kJ/kg", "s": "kJ/kgK",
+           "u": "kJ/kg", "rho": "kg/m3", "v": "m3/kg", "x": "-",
+           "vel_sonido": "m/s", "exergia": "kJ/kg", "mu": "Pa·s",
+           "cp": "kJ/kgK", "cv": "kJ/kgK", "k": "-",
+           "cond": "W/mK", "Pr": "-", "sigma": "N/m",
+           "kappa_T": "1/Pa", "beta": "1/K", "mu_JT": "K/Pa", "dhdP_T": "m3/kg", "Z": "-"},
+    "Imperial": {"T": "°F", "P": "psi", "h": "BTU/lb", "s": "BTU/lbR",
+                 "u": "BTU/lb", "rho": "lb/ft3", "v": "ft3/lb", "x": "-",
+                 "vel_sonido": "ft/s", "exergia": "BTU/lb", "mu": "lb/(ft·s)",
+                 "cp": "kJ/kgK", "cv": "kJ/kgK", "k": "-",
+                 "cond": "BTU/hftF", "Pr": "-", "sigma": "lbf/ft",
+                 "kappa_T": "1/psi", "beta": "1/°F", "mu_JT": "°F/psi", "dhdP_T": "m3/kg", "Z": "-"}
+}
+
+input_units = {k: v[0] for k, v in unit_options.items()}
+output_units = {k: v[0] for k, v in unit_options.items()}
+
+T_ref = 15.0
+P_ref = 101325.0
+
+# Fluidos que se precargan en segundo plano al arrancar el proceso. Se puede
+# cambiar con la variable de entorno ATD_PRECALENTAR (nombres separados por
+# coma; vacía para desactivar el precalentamiento).
+fluidos_precalentar = ["Agua", "R134a", "Aire", "Dióxido de Carbono", "Amoníaco", "R410A"]
+if "ATD_PRECALENTAR" in os.environ:
+    fluidos_precalentar = [f.strip() for f in os.environ["ATD_PRECALENTAR"].split(",") if f.strip()]
+
+# === Conversiones ===
+def to_SI(prop, val, unit):
+    try:
+        if prop == "T":
+            if unit == "°C": return val + 273.15
+            if unit == "K": return val
+            if unit == "°F": return (val - 32) * 5/9 + 273.15
+        if prop == "P":
+            if unit == "Pa": return val
+            if unit == "kPa": return val * 1000
+            if unit == "bar": return val * 1e5
+            if unit == "atm": return val * 101325
+            if unit == "psi": return val * 6894.757
+        if prop in ["h", "u"]:
+            if unit == "kJ/kg": return val * 1000
+            if unit == "J/kg": return val
+            if unit == "BTU/lb": return val * 2326
+        if prop == "s":
+            if unit == "kJ/kgK": return val * 1000
+            if unit == "J/kgK": return val
+            if unit == "BTU/lbR": return val * 4186.8
+        if prop == "rho":
+            if unit == "kg/m3": return val
+            if unit == "lb/ft3": return val * 16.0185
+        if prop == "v":
+            if unit == "m3/kg": return val
+            if unit == "ft3/lb": return val / 16.0185
+        if prop == "vel_sonido":
+            if unit == "m/s": return val
+            if unit == "ft/s": return val / 0.3048
+        if prop == "exergia":
+            if unit == "kJ/kg": return val * 1000
+            if unit == "BTU/lb": return val * 2326
+        if prop == "mu":
+            if unit == "Pa·s": return val
+            if unit == "cP": return val / 1000
+            if unit == "lb/(ft·s)": return val / 47.8803
+        if prop in ["cp", "cv"]:
+            if unit == "J/kgK": return val
+            if unit == "kJ/kgK": return val * 1000
+            if unit == "cal/gK": return val * 4186.8
+            if unit == "kcal/kgK": return val * 4186.8
+        if prop == "cond":
+            if unit == "W/mK": return val
+            if unit == "mW/mK": return val / 1000
+            if unit == "BTU/hftF": return val * 1.730735
+        if prop == "sigma":
+            if unit == "N/m": return val
+            if unit == "mN/m": return val / 1000
+            if unit == "lbf/ft": return val * 14.593903
+        if prop == "kappa_T":
+            if unit == "1/Pa": return val
+            if unit == "1/kPa": return val / 1000
+            if unit == "1/bar": return val / 1e5
+            if unit == "1/psi": return val / 6894.757
+        if prop == "beta":
+            if unit == "1/K": return val
+            if unit == "1/°F": return val * 1.8
+        if prop == "mu_JT":
+            if unit == "K/Pa": return val
+            if unit == "K/bar": return val / 1e5
+            if unit == "K/MPa": return val / 1e6
+            if unit == "°F/psi": return val / (1.8 * 6894.757)
+        if prop == "dhdP_T":
+            if unit == "m3/kg": return val
+            if unit == "kJ/(kg·bar)": return val / 100
+        return val
+    except:
+        return val
+
+def from_SI(prop, val, unit):
+    try:
+        if val is None:
+            return None
+        if prop == "T":
+            if unit == "°C": return val - 273.15
+            if unit == "K": return val
+            if unit == "°F": return val * 9/5 - 459.67
+        if prop == "P":
+            if unit == "Pa": return val
+            if unit == "kPa": return val / 1000
+            if unit == "bar": return val / 1e5
+            if unit == "atm": return val / 101325
+            if unit == "psi": return val / 6894.757
+        if prop in ["h", "u"]:
+            if unit == "kJ/kg": return val / 1000
+            if unit == "J/kg": return val
+            if unit == "BTU/lb": return val / 2326
+        if prop == "s":
+            if unit == "kJ/kgK": return val / 1000
+            if unit == "J/kgK": return val
+            if unit == "BTU/lbR": return val / 4186.8
+        if prop == "rho":
+            if unit == "kg/m3": return val
+            if unit == "lb/ft3": return val / 16.0185
+        if prop == "v":
+            if unit == "m3/kg": return val
+            if unit == "ft3/lb": return val * 16.0185
+        if prop == "vel_sonido":
+            if unit == "m/s": return val
+            if unit == "ft/s": return val * 0.3048
+        if prop == "exergia":
+            if unit == "kJ/kg": return val / 1000
+            if unit == "BTU/lb": return val / 2326
+        if prop == "mu":
+            if unit == "Pa·s": return val
+            if unit == "cP": return val * 1000
+            if unit == "lb/(ft·s)": return val * 47.8803
+        if prop in ["cp", "cv"]:
+            if unit == "J/kgK": return val
+            if unit == "kJ/kgK": return val / 1000
+            if unit == "cal/gK": return val / 4186.8
+            if unit == "kcal/kgK": return val / 4186.8
+        if prop == "cond":
+            if unit == "W/mK": return val
+            if unit == "mW/mK": return val * 1000
+            if unit == "BTU/hftF": return val / 1.730735
+        if prop == "sigma":
+            if unit == "N/m": return val
+            if unit == "mN/m": return val * 1000
+            if unit == "lbf/ft": return val / 14.593903
+        if prop == "kappa_T":
+            if unit == "1/Pa": return val
+            if unit == "1/kPa": return val * 1000
+            if unit == "1/bar": return val * 1e5
+            if unit == "1/psi": return val * 6894.757
+        if prop == "beta":
+            if unit == "1/K": return val
+            if unit == "1/°F": return val / 1.8
+        if prop == "mu_JT":
+            if unit == "K/Pa": return val
+            if unit == "K/bar": return val * 1e5
+            if unit == "K/MPa": return val * 1e6
+            if unit == "°F/psi": return val * 1.8 * 6894.757
+        if prop == "dhdP_T":
+            if unit == "m3/kg": return val
+            if unit == "kJ/(kg·bar)": return val * 100
+        return val
+    except:
+        return val
+
+# === Calcula P a partir de (T,h) or (T,u) ===
+def P_from_T_H_or_U(T_SI, val_SI, fluid, prop="H", dentro_campana=False, fase=None):
+    """
+    Devuelve presión (Pa) para (T, H) o (T, U).
+    Si dentro_campana=True devuelve la presión de saturación en T.
+    Si fase='liquido' o 'vapor', busca en esa fase específica.
+    """
+    import CoolProp.CoolProp as CP
+    try:
+        # si el usuario fuerza dentro de la campana devolvemos la presión de saturación
+        if dentro_campana:
+            return CP.PropsSI("P", "T", T_SI, "Q", 0, fluid)
+        with pool_estados.prestar(fluid) as estado:
+            inversion.resolver(estado, fluid, "T", T_SI, "h" if prop == "H" else "u", val_SI, fase=fase)
+            return estado.p()
+    except Exception:
+        return None
+
+# === Precalentamiento de CoolProp ===
+def precalentar_fluidos(nombres):
+    """Importa CoolProp y carga la ecuación de estado, la saturación y el
+    modelo de transporte de cada fluido para que el primer cálculo sea rápido."""
+    import CoolProp.CoolProp as CP
+    T0 = T_ref + 273.15
+    for nombre in nombres:
+        fluid = fluidos.get(nombre, nombre)
+        llamadas = [
+            ("H", "T", T0, "P", P_ref),
+            ("V", "T", T0, "P", P_ref),
+            ("H", "P", P_ref, "Q", 0),
+            ("S", "T", T0, "Q", 1),
+        ]
+        for salida, n1, v1, n2, v2 in llamadas:
+            try:
+                CP.PropsSI(salida, n1, v1, n2, v2, fluid)
+            except Exception:
+                pass
+        # Estados listos en el pool: el del cálculo y el de la saturación
+        try:
+            pool_estados.precargar(fluid, cantidad=2)
+        except Exception:
+            pass
+
+@st.cache_resource(show_spinner=False)
+def iniciar_precalentamiento(nombres):
+    """Lanza el precalentamiento una sola vez por proceso."""
+    hilo = threading.Thread(target=precalentar_fluidos, args=(list(nombres),),
+                            name="precalentar-coolprop", daemon=True)
+    hilo.start()
+    return hilo
+
+# === Función para calcular todas las propiedades ===
+# La resolución del estado y cada salida están en `propiedades`, compartido con
+# los mapas y la propagación de incertidumbre
+def calcular_propiedades(prop1, val1_SI, prop2, val2_SI, fluid, salidas=None):
+    """`propiedades.calcular_propiedades` con la referencia de exergía de la barra lateral."""
+    return propiedades.calcular_propiedades(prop1, val1_SI, prop2, val2_SI, fluid, salidas,
+                                            T0=T_ref + 273.15, P0=P_ref)
+
+# === Curva de saturación (cacheada por fluido y diagrama) ===
+# Ejes de cada diagrama: (propiedad en x, propiedad en y)
+ejes_diagramas = {"T vs S": ("s", "T"), "P vs v": ("v", "P"), "P vs T": ("T", "P")}
+
+@st.cache_data(show_spinner=False)
+def curva_saturacion(fluid, grafico_tipo):
+    """Devuelve las curvas de saturación en SI para el diagrama pedido, como
+    lista de (nombre, x, y). En mezclas es la envolvente de fases."""
+    import CoolProp.CoolProp as CP
+    x_prop, y_prop = ejes_diagramas[grafico_tipo]
+
+    if mezclas.es_mezcla(fluid):
+        envolvente = mezclas.envolvente_fases(fluid)
+        curvas = []
+        for nombre, q in (("Curva de burbuja", 0.0), ("Curva de rocío", 1.0)):
+            indices = [i for i, qi in enumerate(envolvente["Q"]) if qi == q]
+            curvas.append((nombre, [envolvente[x_prop][i] for i in indices],
+                           [envolvente[y_prop][i] for i in indices]))
+        return curvas
+
+    T_triple = CP.PropsSI('Ttriple', fluid)
+    T_crit = CP.PropsSI('Tcrit', fluid)
+    if (T_triple is None) or (T_crit is None) or (not np.isfinite(T_triple)) or (not np.isfinite(T_crit)):
+        T_triple = 273.15 * 0.5
+        T_crit = 650.0
+    T_vals = np.linspace(T_triple + 0.01, T_crit - 0.01, 200)
+
+    if grafico_tipo == "T vs S":
+        S_liq = []
+        S_vap = []
+        for T in T_vals:
+            try:
+                S_liq.append(CP.PropsSI('S', 'T', T, 'Q', 0, fluid))
+            except Exception:
+                S_liq.append(np.nan)
+            try:
+                S_vap.append(CP.PropsSI('S', 'T', T, 'Q', 1, fluid))
+            except Exception:
+                S_vap.append(np.nan)
+        return [("Líquido saturado", S_liq, list(T_vals)), ("Vapor saturado", S_vap, list(T_vals))]
+
+    if grafico_tipo == "P vs T":
+        P_sat = []
+        for T in T_vals:
+            try:
+                P_sat.append(CP.PropsSI('P', 'T', T, 'Q', 0, fluid))
+            except Exception:
+                P_sat.append(np.nan)
+        return [("Curva de saturación", list(T_vals), P_sat)]
+
+    P_liq = []
+    P_vap = []
+    v_liq = []
+    v_vap = []
+    for T in T_vals:
+        try:
+            P_liq.append(CP.PropsSI('P', 'T', T, 'Q', 0, fluid))
+        except Exception:
+            P_liq.append(np.nan)
+        try:
+            P_vap.append(CP.PropsSI('P', 'T', T, 'Q', 1, fluid))
+        except Exception:
+            P_vap.append(np.nan)
+        try:
+            d_liq = CP.PropsSI('D', 'T', T, 'Q', 0, fluid)
+            v_liq.append(1.0/d_liq if (d_liq is not None and d_liq != 0) else np.nan)
+        except Exception:
+            v_liq.append(np.nan)
+        try:
+            d_vap = CP.PropsSI('D', 'T', T, 'Q', 1, fluid)
+            v_vap.append(1.0/d_vap if (d_vap is not None and d_vap != 0) else np.nan)
+        except Exception:
+            v_vap.append(np.nan)
+    return [("Líquido saturado", v_liq, P_liq), ("Vapor saturado", v_vap, P_vap)]
+
+# === Presentación de resultados ===
+def mostrar_resultados(results):
+    """Muestra un diccionario de resultados en SI en las unidades de salida."""
+    if "estado_termodinamico" in results:
+        # Color diferente según el estado
+        estado = results["estado_termodinamico"]
+        if estado == "Líquido subenfriado":
+            st.info(f"**Estado termodinámico:** {estado} 💧")
+        elif estado == "Vapor sobrecalentado":
+            st.info(f"**Estado termodinámico:** {estado} 🔥")
+        elif estado == "Líquido saturado":
+            st.info(f"**Estado termodinámico:** {estado} 💧")
+        elif estado == "Vapor saturado":
+            st.info(f"**Estado termodinámico:** {estado} 🔥")
+        elif "Mezcla" in estado:
+            st.info(f"**Estado termodinámico:** {estado} 💧🔥")
+        else:
+            st.info(f"**Estado termodinámico:** {estado}")
+
+    for k, v in results.items():
+        if k != "estado_termodinamico":
+            escribir_valor(k, v)
+
+def escribir_valor(k, v_SI):
+    v = from_SI(k, v_SI, output_units[k])
+    if v is not None and isinstance(v, (int, float)) and math.isfinite(v):
+        st.write(f"**{display_names.get(k,k)}** = {v:.5g} {output_units[k]}")
+    else:
+        st.write(f"**{display_names.get(k,k)}**: No disponible")
+
+# === Historial ===
+# Arreglo estructurado de NumPy con un registro por cálculo: entradas y
+# resultados en SI (NaN si no están disponibles), la fecha como timestamp y
+# códigos enteros para el fluido, las propiedades de entrada y el estado. Las
+# unidades se aplican recién al mostrarlo, así que cambiar de unidades no
+# invalida el historial y el gráfico trabaja con columnas enteras.
+max_historial = 20
+salidas_historial = [k for k in salidas_disponibles if k != "estado_termodinamico"]
+magnitudes_entrada = list(props)
+estados_historial = ["", "Líquido subenfriado", "Vapor sobrecalentado", "Mezcla líquido-vapor",
+                     "Líquido saturado", "Vapor saturado", "Líquido", "Vapor"]
+tipo_historial = np.dtype([
+    ("fecha", "f8"), ("fluido", "u2"), ("prop1", "u1"), ("prop2", "u1"),
+    ("valor1", "f8"), ("valor2", "f8"), ("estado", "u1"),
+    # Bit i encendido si se pidió salidas_historial[i]
+    ("calculadas", "u4"),
+] + [(k, "f8") for k in salidas_historial])
+
+def historial_vacio():
+    # Los fluidos se guardan una vez por sesión; cada registro guarda su índice
+    return {"registros": np.zeros(0, dtype=tipo_historial), "fluidos": []}
+
+def guardar_en_historial(entrada, results, fluid):
+    """Agrega un cálculo al historial. `entrada` es (prop1, val1_SI, prop2, val2_SI)."""
+    hist = st.session_state['historial']
+    if fluid not in hist["fluidos"]:
+        hist["fluidos"].append(fluid)
+    prop1, val1_SI, prop2, val2_SI = entrada
+
+    registro = np.zeros(1, dtype=tipo_historial)
+    registro["fecha"] = datetime.now(tz).timestamp()
+    registro["fluido"] = hist["fluidos"].index(fluid)
+    registro["prop1"] = magnitudes_entrada.index(prop1)
+    registro["prop2"] = magnitudes_entrada.index(prop2)
+    registro["valor1"] = val1_SI
+    registro["valor2"] = val2_SI
+    estado = results.get("estado_termodinamico", "")
+    registro["estado"] = estados_historial.index(estado) if estado in estados_historial else 0
+    calculadas = 0
+    for i, k in enumerate(salidas_historial):
+        if k in results:
+            calculadas |= 1 << i
+            registro[k] = results[k] if results[k] is not None else np.nan
+    registro["calculadas"] = calculadas
+
+    hist["registros"] = np.concatenate([hist["registros"][-(max_historial - 1):], registro])
+
+# === Streamlit UI ===
+st.title("Atlas Termodinámico Digital (ATD)")
+st.subheader("Calculadora de propiedades termodinámicas")
+
+# Fluido
+fluido_seleccionado = st.selectbox("Selecciona el fluido", fluido_lista_organizada,
+                                   index=fluido_lista_organizada.index("Agua"))
+if fluido_seleccionado.startswith("---"):
+    fluido_seleccionado = "Agua"
+if fluido_seleccionado == "Mezcla personalizada":
+    # Mezcla HEOS por fracciones molares (se normalizan para sumar 1)
+    componentes = st.multiselect("Componentes", mezclas.componentes_disponibles(), default=["Methane", "Ethane"])
+    composicion_mezcla = {}
+    for col, componente in zip(st.columns(max(len(componentes), 1)), componentes):
+        with col:
+            composicion_mezcla[componente] = st.number_input(f"x {componente}", min_value=0.0, max_value=1.0,
+                                                             value=round(1.0 / len(componentes), 4),
+                                                             format="%.4f", key=f"fraccion_{componente}")
+    try:
+        fluido_cp = mezclas.nombre_mezcla(composicion_mezcla)
+    except ValueError as e:
+        st.warning(str(e))
+        st.stop()
+    st.caption(f"Mezcla: {fluido_cp}")
+else:
+    fluido_cp = fluidos[fluido_seleccionado]
+
+# === Barra lateral (fragmento) ===
+# Cambiar la referencia de exergía solo re-ejecuta este fragmento. Las unidades
+# afectan a etiquetas y gráficos del resto de la página, así que si cambian se
+# relanza la app completa.
+@st.fragment
+def barra_lateral():
+    global T_ref, P_ref
+    # Partir siempre de los valores por defecto para que los widgets se
+    # construyan igual en un rerun completo que en uno del fragmento
+    input_units.update({k: v[0] for k, v in unit_options.items()})
+    output_units.update({k: v[0] for k, v in unit_options.items()})
+
+    # Presets
+    st.header("Configuración rápida")
+    preset_choice = st.radio("Sistema de unidades", ["Ninguno", "SI", "Imperial"])
+    if preset_choice != "Ninguno":
+        input_units.update(preset_systems[preset_choice])
+        output_units.update(preset_systems[preset_choice])
+
+    # Unidades
+    st.header("Configuración de unidades")
+    st.subheader("Entrada")
+    for p in list(props.keys()) + extra_props:
+        input_units[p] = st.selectbox(f"Unidad ingreso {display_names.get(p,p)}",
+                                      unit_options[p], index=unit_options[p].index(input_units.get(p, unit_options[p][0])))
+    st.subheader("Salida")
+    for p in list(props.keys()) + extra_props:
+        output_units[p] = st.selectbox(f"Unidad salida {display_names.get(p,p)}",
+                                       unit_options[p], index=unit_options[p].index(output_units.get(p, unit_options[p][0])))
+
+    # Estado referencia exergía
+    st.header("Estado referencia exergía")
+    T_ref = st.number_input("Temperatura referencia [°C]", value=15.0)
+    P_ref = st.number_input("Presión referencia [Pa]", value=101325.0)
+
+    unidades = (dict(input_units), dict(output_units))
+    anteriores = st.session_state.get('unidades_activas')
+    st.session_state['unidades_activas'] = unidades
+    if anteriores is not None and anteriores != unidades:
+        st.rerun()
+
+with st.sidebar:
+    barra_lateral()
+
+# Propiedades independientes (usar text_input para permitir coma)
+st.subheader("Propiedades independientes")
+prop1 = st.selectbox("Propiedad 1", list(props.keys()), index=0)
+val1_str = st.text_input(f"Valor {display_names.get(prop1, prop1)} ({input_units[prop1]})", value="25.0")
+try:
+    val1 = float(val1_str.replace(',', '.'))
+except:
+    val1 = 0.0
+
+prop2 = st.selectbox("Propiedad 2", list(props.keys()), index=1)
+val2_str = st.text_input(f"Valor {display_names.get(prop2, prop2)} ({input_units[prop2]})", value="101325.0")
+try:
+    val2 = float(val2_str.replace(',', '.'))
+except:
+    val2 = 0.0
+
+# Propiedades a calcular: T, P, s, v y el estado se calculan siempre porque
+# ubican el punto en los diagramas; el resto solo si se eligen
+salidas_fijas = ["T", "P", "s", "v", "estado_termodinamico"]
+opciones_salida = [k for k in salidas_disponibles if k not in salidas_fijas + salidas_derivadas]
+salidas_elegidas = st.multiselect("Propiedades a calcular", opciones_salida,
+                                  default=[k for k in salidas_por_defecto if k in opciones_salida],
+                                  format_func=lambda k: display_names.get(k, k))
+if st.checkbox("Derivadas termodinámicas (κT, β, μJT, (∂h/∂P)T, Z)", value=False):
+    salidas_elegidas = salidas_elegidas + salidas_derivadas
+salidas_calculo = [k for k in salidas_disponibles if k in salidas_fijas or k in salidas_elegidas]
+
+# Checkbox "dentro de la campana" solo visible si entras por T & H o T & U
+dentro_campana_checkbox = False
+mostrar_opciones_fase = False
+if ("T" in (prop1, prop2)) and (("h" in (prop1, prop2)) or ("u" in (prop1, prop2))):
+    dentro_campana_checkbox = st.checkbox("Dentro de la campana?", value=False)
+    if not dentro_campana_checkbox:
+        mostrar_opciones_fase = st.checkbox("No estoy seguro, mostrar todas las opciones", value=False)
+
+# Inicializar historial
+if 'historial' not in st.session_state:
+    st.session_state['historial'] = historial_vacio()
+
+# Zona horaria
+tz = pytz.timezone("America/Argentina/Buenos_Aires")
+
+# Botón calcular: la salida se guarda en session_state como una lista de
+# (tipo, contenido) para mostrarla en los reruns siguientes sin recalcular
+if st.button("Calcular"):
+    salida = []
+
+    # Convertir valores a SI
+    val1_SI = to_SI(prop1, val1, input_units.get(prop1, "°C"))
+    val2_SI = to_SI(prop2, val2, input_units.get(prop2, "Pa"))
+    entrada = (prop1, val1_SI, prop2, val2_SI)
+    
+    # Caso especial: T y h o T y u
+    if ("T" in (prop1, prop2)) and (("h" in (prop1, prop2)) or ("u" in (prop1, prop2))):
+        if prop1 == "T":
+            T_SI = val1_SI
+            prop_HU = prop2
+            val_HU_SI = val2_SI
+        else:
+            T_SI = val2_SI
+            prop_HU = prop1
+            val_HU_SI = val1_SI
+        
+        prop_for_func = "H" if prop_HU == "h" else "U"
+        
+        if dentro_campana_checkbox:
+            # Dentro de la campana: usar P y h (o P y u)
+            P_guess = P_from_T_H_or_U(T_SI, val_HU_SI, fluido_cp, prop=prop_for_func, dentro_campana=True)
+            if P_guess is not None:
+                results = calcular_propiedades("P", P_guess, prop_HU, val_HU_SI, fluido_cp, salidas_calculo)
+                salida.append(("subheader", "Resultados (Dentro de la campana)"))
+                salida.append(("resultados", results))
+                guardar_en_historial(entrada, results, fluido_cp)
+            else:
+                salida.append(("error", "No se pudo encontrar una presión válida para los valores dados"))
+        
+        elif mostrar_opciones_fase:
+            # Mostrar ambas opciones (líquido y vapor)
+            salida.append(("subheader", "Múltiples soluciones posibles"))
+            salida.append(("info", "Para los valores ingresados, existen dos estados posibles:"))
+            
+            # Intentar líquido comprimido
+            P_liq = P_from_T_H_or_U(T_SI, val_HU_SI, fluido_cp, prop=prop_for_func, fase='liquido')
+            results_liq = None
+            if P_liq is not None:
+                results_liq = calcular_propiedades("T", T_SI, "P", P_liq, fluido_cp, salidas_calculo)
+                salida.append(("subheader", "Opción 1: Líquido comprimido"))
+                salida.append(("resultados", results_liq))
+
+            # Intentar vapor sobrecalentado
+            P_vap = P_from_T_H_or_U(T_SI, val_HU_SI, fluido_cp, prop=prop_for_func, fase='vapor')
+            results_vap = None
+            if P_vap is not None:
+                results_vap = calcular_propiedades("T", T_SI, "P", P_vap, fluido_cp, salidas_calculo)
+                salida.append(("subheader", "Opción 2: Vapor sobrecalentado"))
+                salida.append(("resultados", results_vap))
+            
+            # Mostrar advertencia siempre (incluso si hay resultados)
+            salida.append(("warning", """
+            **💡 Nota importante sobre T y h / T y u:**
+            Para una misma temperatura y entalpía (o energía interna) pueden existir **dos estados diferentes**:
+            - **Líquido comprimido** (alta presión)
+            - **Vapor sobrecalentado** (baja presión)
+            
+            Si los resultados no coinciden con lo esperado, prueba marcando la opción 'Dentro de la campana?' 
+            o verifica que los valores ingresados sean consistentes.
+            """))
+            
+            # Verificar si ambas opciones están vacías o no disponibles
+            liq_todos_none = results_liq is None or all(v is None for v in results_liq.values() if v is not None)
+            vap_todos_none = results_vap is None or all(v is None for v in results_vap.values() if v is not None)
+            
+            if liq_todos_none and vap_todos_none:
+                salida.append(("warning", """
+                **🔍 Situación especial:**
+                Ambas opciones aparecen como 'No disponible', lo que indica que los valores ingresados 
+                muy probablemente corresponden a un estado **dentro de la campana de saturación**.
+                
+                **Solución inmediata:** Marca 'Dentro de la campana?' y vuelve a calcular.
+                """))
+            elif P_liq is None and P_vap is None:
+                salida.append(("error", "No se encontraron soluciones para los valores dados"))
+        
+        else:
+            # Búsqueda automática: el solver parte del estado conocido más cercano
+            results = calcular_propiedades(prop1, val1_SI, prop2, val2_SI, fluido_cp, salidas_calculo)
+            salida.append(("subheader", "Resultados"))
+            salida.append(("resultados", results))
+            guardar_en_historial(entrada, results, fluido_cp)
+    
+    # Caso general: otras combinaciones de propiedades
+    else:
+        # Usar CoolProp directamente
+        results = calcular_propiedades(prop1, val1_SI, prop2, val2_SI, fluido_cp, salidas_calculo)
+        salida.append(("subheader", "Resultados"))
+        salida.append(("resultados", results))
+        guardar_en_historial(entrada, results, fluido_cp)
+
+    st.session_state['salida_calculo'] = salida
+
+# Mostrar el último cálculo guardado
+for tipo, contenido in st.session_state.get('salida_calculo', []):
+    if tipo == "resultados":
+        mostrar_resultados(contenido)
+    else:
+        getattr(st, tipo)(contenido)
+
+# === Propagación de incertidumbre (fragmento) ===
+# Las entradas son las propiedades independientes de arriba; cada una lleva su
+# distribución y las salidas son las propiedades a calcular (salvo el estado)
+def distribucion_entrada(i, prop, valor):
+    import incertidumbre
+
+    unidad = input_units[prop]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        distribucion = st.selectbox(f"Distribución {display_names.get(prop, prop)}",
+                                    list(incertidumbre.distribuciones), key=f"incertidumbre_dist_{i}")
+    with col2:
+        # Un porcentaje de una temperatura en °C o °F no tiene sentido: T va siempre en su unidad
+        tipos = [unidad] if prop == "T" else [unidad, "%"]
+        relativa = st.selectbox("Ancho en", tipos, index=len(tipos) - 1,
+                                key=f"incertidumbre_tipo_{i}_{prop}_{unidad}") == "%"
+    with col3:
+        simbolo = incertidumbre.distribuciones[distribucion]
+        ancho = st.number_input(f"{simbolo} ({'%' if relativa else unidad})", min_value=0.0,
+                                value=1.0 if relativa else 0.5, format="%.4g",
+                                key=f"incertidumbre_ancho_{i}_{prop}_{unidad}_{relativa}")
+    return distribucion, ancho, relativa
+
+@st.fragment
+def seccion_incertidumbre():
+    panel = st.expander("Propagación de incertidumbre (Monte Carlo)", key="expander_incertidumbre", on_change="rerun")
+    if not panel.open:
+        return
+    with panel:
+        import incertidumbre
+
+        st.caption(f"Entradas: {display_names.get(prop1, prop1)} = {val1:g} {input_units[prop1]}, "
+                   f"{display_names.get(prop2, prop2)} = {val2:g} {input_units[prop2]}")
+        especificacion = [distribucion_entrada(1, prop1, val1),
+                          distribucion_entrada(2, prop2, val2)]
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            n = st.number_input("Muestras", min_value=100, max_value=200000, value=10000, step=1000)
+        with col2:
+            semilla = st.number_input("Semilla", min_value=0, value=0, step=1)
+        with col3:
+            # Las tablas BICUBIC no admiten mezclas definidas por composición
+            backends = ["HEOS"] if mezclas.es_mezcla(fluido_cp) else incertidumbre.backends
+            backend = st.selectbox("Backend CoolProp", backends, key="incertidumbre_backend",
+                                   help="BICUBIC&HEOS interpola en tablas: varias veces más rápido, con un error "
+                                        "pequeño cerca del punto crítico. Los pares T–h, T–u, h–u, s–u y con x "
+                                        "se resuelven siempre con HEOS")
+
+        if st.button("Propagar incertidumbre"):
+            rng = np.random.default_rng(int(semilla))
+            muestras = [to_SI(prop, incertidumbre.muestrear(valor, distribucion, ancho, int(n), rng, relativa),
+                              input_units[prop])
+                        for (prop, valor), (distribucion, ancho, relativa) in zip(((prop1, val1), (prop2, val2)),
+                                                                                  especificacion)]
+            salidas = [k for k in salidas_calculo if k in incertidumbre.salidas_soportadas]
+            valores = {k: np.full(int(n), np.nan) for k in salidas}
+            fases = np.full(int(n), -1, dtype=np.int8)
+            progreso = st.progress(0.0, text="Evaluando muestras...")
+            hechas = 0
+            try:
+                for inicio, bloque in incertidumbre.evaluar_muestras(fluido_cp, prop1, muestras[0], prop2, muestras[1],
+                                                                     salidas, backend, T0=T_ref + 273.15, P0=P_ref):
+                    fin = inicio + len(bloque["fase"])
+                    for k in salidas:
+                        valores[k][inicio:fin] = bloque[k]
+                    fases[inicio:fin] = bloque["fase"]
+                    hechas += fin - inicio
+                    progreso.progress(hechas / int(n), text=f"Evaluando muestras... {hechas}/{int(n)}")
+                st.session_state['incertidumbre'] = {"fluido": fluido_cp, "n": int(n), "valores": valores,
+                                                     "fases": fases}
+            except Exception as e:
+                st.error(f"No se pudo propagar la incertidumbre: {e}")
+            progreso.empty()
+
+        resultado = st.session_state.get('incertidumbre')
+        if not resultado or resultado["fluido"] != fluido_cp:
+            return
+        # Los estadísticos se calculan sobre las muestras ya convertidas a las
+        # unidades de salida (así el desvío de T en °C no arrastra el offset)
+        filas = []
+        for k, v_SI in resultado["valores"].items():
+            unidad = output_units[k]
+            r = incertidumbre.resumen(from_SI(k, v_SI, unidad))
+            if r is None:
+                filas.append({"Propiedad": f"{display_names.get(k, k)} ({unidad})", "Media": "No disponible",
+                              "Muestras": 0})
+                continue
+            fila = {"Propiedad": f"{display_names.get(k, k)} ({unidad})",
+                    "Media": f"{r['media']:.5g}", "Desvío": f"{r['desvio']:.3g}"}
+            for p, v in r["percentiles"].items():
+                fila[f"P{p:g}"] = f"{v:.5g}"
+            fila["Muestras"] = r["validas"]
+            filas.append(fila)
+        st.table(filas)
+
+        sin_solucion = int((resultado["fases"] < 0).sum())
+        if sin_solucion:
+            st.info(f"{sin_solucion} de {resultado['n']} muestras sin solución (fuera del rango del fluido "
+                    f"o valores de entrada incompatibles)")
+        fracciones = incertidumbre.fracciones_fases(resultado["fases"])
+        if len(fracciones) > 1:
+            st.warning("Las muestras caen en distintas fases: "
+                       + ", ".join(f"{nombre} {100 * f:.1f} %" for nombre, f in fracciones.items()))
+
+        k = st.selectbox("Histograma de", list(resultado["valores"]),
+                         format_func=lambda k: f"{display_names.get(k, k)} ({output_units[k]})",
+                         key="incertidumbre_histograma")
+        import plotly.graph_objects as go
+        v = from_SI(k, resultado["valores"][k], output_units[k])
+        fig = go.Figure(go.Histogram(x=v[np.isfinite(v)], nbinsx=60))
+        fig.update_layout(xaxis_title=f"{display_names.get(k, k)} ({output_units[k]})", yaxis_title="Muestras",
+                          bargap=0.02)
+        st.plotly_chart(fig, width="stretch")
+
+seccion_incertidumbre()
+
+# === Historial (fragmento) ===
+# Mover el slider solo re-ejecuta el detalle; borrar puntos re-ejecuta el
+# historial y el gráfico, que los dibuja, pero no el resto de la página.
+@st.fragment
+def detalle_historial():
+    hist = st.session_state['historial']
+    registros = hist["registros"]
+    max_index = len(registros) - 1
+    index = st.slider("Selecciona cálculo", 0, max_index, max_index, key="slider_historial") if len(registros) > 1 else 0
+    r = registros[index]
+
+    st.write(f"**Cálculo {index+1} ({datetime.fromtimestamp(r['fecha'], tz).strftime('%d/%m/%Y %H:%M:%S')})**")
+    st.write(f"**Fluido:** {hist['fluidos'][r['fluido']]}")
+    st.write("**Entradas:**")
+    for codigo, val_SI in ((r["prop1"], r["valor1"]), (r["prop2"], r["valor2"])):
+        prop = magnitudes_entrada[codigo]
+        st.write(f"{display_names.get(prop, prop)} = {from_SI(prop, val_SI, input_units[prop]):.6g} {input_units[prop]}")
+    st.write("**Resultados:**")
+    if r["estado"]:
+        st.write(f"**Estado termodinámico:** {estados_historial[r['estado']]}")
+    for i, k in enumerate(salidas_historial):
+        if r["calculadas"] & (1 << i):
+            escribir_valor(k, r[k])
+
+def borrar_punto_historial():
+    registros = st.session_state['historial']["registros"]
+    index = st.session_state.get("slider_historial", len(registros) - 1) if len(registros) > 1 else 0
+    st.session_state['historial']["registros"] = np.delete(registros, min(index, len(registros) - 1))
+
+def borrar_historial():
+    st.session_state['historial'] = historial_vacio()
+
+@st.fragment
+def seccion_historial():
+    if len(st.session_state['historial']["registros"]):
+        with st.expander("Mostrar Historial"):
+            # Botones para borrar puntos específicos (los callbacks se ejecutan
+            # antes del rerun del fragmento, así se redibuja ya sin el punto)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.button("🗑️ Borrar este punto", key="borrar_individual", on_click=borrar_punto_historial)
+            with col2:
+                st.button("🗑️ Borrar todos los puntos", key="borrar_todos", on_click=borrar_historial)
+
+            detalle_historial()
+
+    seccion_grafico()
+
+# === Gráfico interactivo plegable (fragmento) ===
+@st.fragment
+def seccion_grafico():
+    registros = st.session_state['historial']["registros"]
+    # El contenido solo se construye con el expander abierto, y plotly se
+    # importa recién entonces
+    grafico = st.expander("Mostrar Gráfico", key="expander_grafico", on_change="rerun")
+    if not grafico.open:
+        return
+    with grafico:
+        import plotly.graph_objects as go
+
+        grafico_tipo = st.selectbox("Selecciona diagrama", ["T vs S", "P vs v"])
+        fig = go.Figure()
+        try:
+            x_prop, y_prop = ejes_diagramas[grafico_tipo]
+            for nombre, xs, ys in curva_saturacion(fluido_cp, grafico_tipo):
+                puntos = [(from_SI(x_prop, x, output_units[x_prop]), from_SI(y_prop, y, output_units[y_prop]))
+                          for x, y in zip(xs, ys)
+                          if x is not None and y is not None and np.isfinite(x) and np.isfinite(y)]
+                fig.add_trace(go.Scatter(x=[p[0] for p in puntos], y=[p[1] for p in puntos], mode='lines', name=nombre))
+            titulos = {"s": "S", "T": "T", "v": "v", "P": "P"}
+            fig.update_layout(xaxis_title=f"{titulos[x_prop]} ({output_units[x_prop]})",
+                              yaxis_title=f"{titulos[y_prop]} ({output_units[y_prop]})")
+
+            # Puntos válidos del historial, convertidos por columnas completas
+            x_hist = from_SI(x_prop, registros[x_prop], output_units[x_prop])
+            y_hist = from_SI(y_prop, registros[y_prop], output_units[y_prop])
+            validos = (np.isfinite(x_hist) & np.isfinite(y_hist) &
+                       (np.abs(x_hist) < 1e10) & (np.abs(y_hist) < 1e10))
+            # Lista para todos los puntos en orden (para las flechas)
+            todos_los_puntos = [(x_hist[i], y_hist[i], i) for i in np.flatnonzero(validos)]
+
+            # Separar por estado termodinámico
+            estados = np.array(estados_historial, dtype=object)[registros["estado"]]
+            def puntos_con_estado(mascara):
+                return [(x_hist[i], y_hist[i], i) for i in np.flatnonzero(validos & mascara)]
+            puntos_liquido_sub = puntos_con_estado(estados == "Líquido subenfriado")
+            puntos_vapor_sup = puntos_con_estado(estados == "Vapor sobrecalentado")
+            puntos_mezcla = puntos_con_estado(estados == "Mezcla líquido-vapor")
+            saturados = (estados == "Líquido saturado") | (estados == "Vapor saturado")
+            puntos_saturado = puntos_con_estado(saturados)
+            otros_puntos = puntos_con_estado(~np.isin(estados, ["Líquido subenfriado", "Vapor sobrecalentado",
+                                                                "Mezcla líquido-vapor"]) & ~saturados)
+
+            # Crear trazas para cada estado termodinámico
+            if puntos_liquido_sub:
+                x_vals, y_vals, indices = zip(*puntos_liquido_sub)
+                fig.add_trace(go.Scatter(
+                    x=x_vals, y=y_vals, mode='markers+text', text=[str(i+1) for i in indices],
+                    textposition="top right", marker=dict(size=8, color='blue'), name="Líquido subenfriado"
+                ))
+
+            if puntos_vapor_sup:
+                x_vals, y_vals, indices = zip(*puntos_vapor_sup)
+                fig.add_trace(go.Scatter(
+                    x=x_vals, y=y_vals, mode='markers+text', text=[str(i+1) for i in indices],
+                    textposition="top right", marker=dict(size=8, color='red'), name="Vapor sobrecalentado"
+                ))
+
+            if puntos_mezcla:
+                x_vals, y_vals, indices = zip(*puntos_mezcla)
+                fig.add_trace(go.Scatter(
+                    x=x_vals, y=y_vals, mode='markers+text', text=[str(i+1) for i in indices],
+                    textposition="top right", marker=dict(size=8, color='green'), name="Mezcla"
+                ))
+
+            if puntos_saturado:
+                x_vals, y_vals, indices = zip(*puntos_saturado)
+                fig.add_trace(go.Scatter(
+                    x=x_vals, y=y_vals, mode='markers+text', text=[str(i+1) for i in indices],
+                    textposition="top right", marker=dict(size=8, color='orange'), name="Saturado"
+                ))
+
+            if otros_puntos:
+                x_vals, y_vals, indices = zip(*otros_puntos)
+                fig.add_trace(go.Scatter(
+                    x=x_vals, y=y_vals, mode='markers+text', text=[str(i+1) for i in indices],
+                    textposition="top right", marker=dict(size=8, color='gray'), name="Otros"
+                ))
+
+            # Dibujar flechas conectando los puntos en orden
+            if len(todos_los_puntos) > 1:
+                # Ordenar puntos por índice (orden en el historial)
+                todos_los_puntos.sort(key=lambda x: x[2])
+        
+                for i in range(len(todos_los_puntos)-1):
+                    x1, y1, idx1 = todos_los_puntos[i]
+                    x2, y2, idx2 = todos_los_puntos[i+1]
+            
+                    fig.add_annotation(
+                        x=x2, y=y2,
+                        ax=x1, ay=y1,
+                        xref="x", yref="y",
+                        axref="x", ayref="y",
+                        showarrow=True,
+                        arrowhead=3,
+                        arrowsize=1,
+                        arrowwidth=1.5,
+                        arrowcolor="orange"
+                    )
+        
+                # Añadir traza invisible para la leyenda de flechas
+                fig.add_trace(go.Scatter(
+                    x=[None], y=[None],
+                    mode='lines',
+                    line=dict(color='purple', width=2),
+                    name="Secuencia de cálculos"
+                ))
+
+        except Exception as e:
+            st.write("No se pudo generar la curva de saturación:", e)
+
+        st.plotly_chart(fig, width="stretch")
+
+seccion_historial()
+
+# === Mapa de propiedades (fragmento) ===
+propiedades_mapa = ["rho", "cp", "mu", "vel_sonido", "Z", "exergia"]
+
+# Segundos mínimos entre dos actualizaciones del mapa parcial
+intervalo_mapa = 0.5
+
+def figura_mapa(T_vals, P_vals, Z, propiedad, escala_P, titulo=""):
+    """Mapa de calor en unidades de salida con la curva de saturación encima."""
+    import plotly.graph_objects as go
+
+    unidad = output_units[propiedad]
+    T_out = from_SI("T", T_vals, output_units["T"])
+    P_out = from_SI("P", P_vals, output_units["P"])
+    fig = go.Figure(go.Heatmap(
+        x=T_out, y=P_out, z=from_SI(propiedad, Z, unidad),
+        colorscale="Viridis", colorbar=dict(title=f"{display_names[propiedad]} ({unidad})"),
+    ))
+    try:
+        for nombre, xs, ys in curva_saturacion(fluido_cp, "P vs T"):
+            puntos = [(from_SI("T", x, output_units["T"]), from_SI("P", y, output_units["P"]))
+                      for x, y in zip(xs, ys)
+                      if np.isfinite(x) and np.isfinite(y) and T_vals[0] <= x <= T_vals[-1] and P_vals[0] <= y <= P_vals[-1]]
+            if puntos:
+                fig.add_trace(go.Scatter(x=[p[0] for p in puntos], y=[p[1] for p in puntos], mode="lines",
+                                         line=dict(color="white", width=2), name=nombre))
+    except Exception:
+        pass
+    fig.update_layout(title=titulo, xaxis_title=f"T ({output_units['T']})", yaxis_title=f"P ({output_units['P']})",
+                      yaxis_type="log" if escala_P == "log" else "linear",
+                      legend=dict(orientation="h", y=-0.2))
+    return fig
+
+@st.fragment
+def seccion_mapa():
+    panel = st.expander("Mapa de propiedades", key="expander_mapa", on_change="rerun")
+    if not panel.open:
+        return
+    with panel:
+        import mapas
+
+        propiedad = st.selectbox("Propiedad del mapa", propiedades_mapa,
+                                 format_func=lambda k: f"{display_names[k]} ({output_units[k]})")
+        unidad_T = input_units["T"]
+        unidad_P = input_units["P"]
+        col1, col2 = st.columns(2)
+        with col1:
+            T_min = st.number_input(f"T mínima ({unidad_T})", value=float(from_SI("T", 300.0, unidad_T)),
+                                    key=f"mapa_T_min_{unidad_T}")
+            T_max = st.number_input(f"T máxima ({unidad_T})", value=float(from_SI("T", 900.0, unidad_T)),
+                                    key=f"mapa_T_max_{unidad_T}")
+            n_T = st.number_input("Puntos en T", min_value=10, max_value=1000, value=200, step=50)
+        with col2:
+            P_min = st.number_input(f"P mínima ({unidad_P})", value=float(from_SI("P", 1e4, unidad_P)),
+                                    key=f"mapa_P_min_{unidad_P}")
+            P_max = st.number_input(f"P máxima ({unidad_P})", value=float(from_SI("P", 5e7, unidad_P)),
+                                    key=f"mapa_P_max_{unidad_P}")
+            n_P = st.number_input("Puntos en P", min_value=10, max_value=1000, value=200, step=50)
+        escala_P = "log" if st.checkbox("Presión en escala logarítmica", value=True) else "lineal"
+        # Las tablas BICUBIC no admiten mezclas definidas por composición
+        backends = ["HEOS"] if mezclas.es_mezcla(fluido_cp) else mapas.backends
+        backend = st.selectbox("Backend CoolProp", backends,
+                               help="BICUBIC&HEOS interpola en tablas: mucho más rápido en grillas grandes, "
+                                    "con un error pequeño cerca del punto crítico")
+
+        # Se dibuja siempre en el mismo lugar: primero los mapas parciales y
+        # después el mapa completo guardado en la sesión
+        grafico = st.empty()
+        if st.button(f"Generar mapa para {fluido_seleccionado}"):
+            T_vals, P_vals = mapas.grilla(to_SI("T", T_min, unidad_T), to_SI("T", T_max, unidad_T), int(n_T),
+                                          to_SI("P", P_min, unidad_P), to_SI("P", P_max, unidad_P), int(n_P), escala_P)
+            Z = np.full((len(P_vals), len(T_vals)), np.nan)
+            progreso = st.progress(0.0, text="Evaluando la grilla...")
+            filas = 0
+            ultimo = time.monotonic()
+            try:
+                for fila, bloque in mapas.generar_mapa(fluido_cp, propiedad, T_vals, P_vals, backend,
+                                                       T0=T_ref + 273.15, P0=P_ref):
+                    Z[fila:fila + len(bloque)] = bloque
+                    filas += len(bloque)
+                    progreso.progress(filas / len(P_vals), text=f"Evaluando la grilla... {filas}/{len(P_vals)} presiones")
+                    if filas < len(P_vals) and time.monotonic() - ultimo > intervalo_mapa:
+                        grafico.plotly_chart(figura_mapa(T_vals, P_vals, Z, propiedad, escala_P,
+                                                         f"{filas}/{len(P_vals)} presiones"),
+                                             width="stretch")
+                        ultimo = time.monotonic()
+                st.session_state['mapa'] = {"fluido": fluido_cp, "propiedad": propiedad, "escala_P": escala_P,
+                                            "T": T_vals, "P": P_vals, "Z": Z}
+            except Exception as e:
+                st.error(f"No se pudo generar el mapa: {e}")
+            progreso.empty()
+
+        mapa = st.session_state.get('mapa')
+        if mapa and mapa["fluido"] == fluido_cp:
+            grafico.plotly_chart(figura_mapa(mapa["T"], mapa["P"], mapa["Z"], mapa["propiedad"], mapa["escala_P"]),
+                                 width="stretch")
+            if np.isnan(mapa["Z"]).any():
+                st.info("Los puntos sin solución de CoolProp quedan en blanco")
+
+seccion_mapa()
+
+# === Ciclos termodinámicos (fragmento) ===
+# Por ciclo: (parámetro, etiqueta, magnitud para las unidades, valor por
+# defecto en SI, rango por defecto del estudio paramétrico en SI)
+parametros_ciclos = {
+    "Rankine": ("rankine", [
+        ("P_alta", "Presión caldera", "P", 8e6, (2e6, 15e6)),
+        ("P_baja", "Presión condensador", "P", 1e4, (5e3, 1e5)),
+        ("T_turbina", "Temperatura entrada turbina", "T", 753.15, (650.0, 900.0)),
+        ("eta_turbina", "Rendimiento isentrópico turbina", None, 0.85, (0.6, 1.0)),
+        ("eta_bomba", "Rendimiento isentrópico bomba", None, 1.0, (0.6, 1.0)),
+        ("T_fuente", "Temperatura fuente de calor (caldera)", "T", 1273.15, (900.0, 1800.0)),
+        ("T_sumidero", "Temperatura sumidero (condensador)", "T", 288.15, (273.15, 313.15)),
+    ]),
+    "Refrigeración / bomba de calor": ("refrigeracion", [
+        ("T_evap", "Temperatura evaporación", "T", 263.15, (243.15, 283.15)),
+        ("T_cond", "Temperatura condensación", "T", 313.15, (298.15, 333.15)),
+        ("sobrecalentamiento", "Sobrecalentamiento [K]", None, 0.0, (0.0, 15.0)),
+        ("subenfriamiento", "Subenfriamiento [K]", None, 0.0, (0.0, 15.0)),
+        ("eta_compresor", "Rendimiento isentrópico compresor", None, 0.8, (0.5, 1.0)),
+        ("T_frio", "Temperatura espacio frío", "T", 273.15, (253.15, 288.15)),
+        ("T_caliente", "Temperatura sumidero (condensador)", "T", 288.15, (273.15, 308.15)),
+    ]),
+    "Brayton": ("brayton", [
+        ("P_baja", "Presión entrada compresor", "P", 1e5, (1e5, 1e6)),
+        ("relacion_presiones", "Relación de presiones", None, 10.0, (2.0, 30.0)),
+        ("T_compresor", "Temperatura entrada compresor", "T", 288.15, (250.0, 320.0)),
+        ("T_turbina", "Temperatura entrada turbina", "T", 1373.15, (900.0, 1600.0)),
+        ("eta_compresor", "Rendimiento isentrópico compresor", None, 0.85, (0.6, 1.0)),
+        ("eta_turbina", "Rendimiento isentrópico turbina", None, 0.85, (0.6, 1.0)),
+        ("T_fuente", "Temperatura fuente de calor", "T", 1673.15, (1400.0, 2000.0)),
+        ("T_sumidero", "Temperatura sumidero (enfriador)", "T", 288.15, (250.0, 288.15)),
+    ]),
+}
+
+# Indicadores que se pueden graficar en el estudio paramétrico y su magnitud
+indicadores_ciclos = {
+    "rankine": ["eficiencia", "w_neto", "exergia_destruida_total"],
+    "refrigeracion": ["COP_refrigeracion", "COP_bomba_calor", "w_entrada", "exergia_destruida_total"],
+    "brayton": ["eficiencia", "w_neto", "relacion_trabajo_retroceso", "exergia_destruida_total"],
+}
+nombres_indicadores = {
+    "eficiencia": ("η", None), "w_neto": ("w neto", "h"), "w_entrada": ("w entrada", "h"),
+    "COP_refrigeracion": ("COP refrigeración", None), "COP_bomba_calor": ("COP bomba de calor", None),
+    "relacion_trabajo_retroceso": ("Relación de trabajo de retroceso", None),
+    "exergia_destruida_total": ("Exergía destruida total", "exergia"),
+    "q_entrada": ("q entrada", "h"), "q_salida": ("q salida", "h"), "w_salida": ("w salida", "h"),
+}
+
+def valor_indicador(clave, valor):
+    """Convierte un indicador del ciclo a las unidades de salida."""
+    magnitud = nombres_indicadores[clave][1]
+    if magnitud is None or valor is None:
+        return valor
+    return from_SI(magnitud, valor, output_units[magnitud])
+
+def etiqueta_indicador(clave):
+    nombre, magnitud = nombres_indicadores[clave]
+    return f"{nombre} ({output_units[magnitud]})" if magnitud else nombre
+
+def mostrar_ciclo(ciclo):
+    st.write(f"**Fluido:** {ciclo['fluido']}")
+    filas = []
+    for e in ciclo["estados"]:
+        filas.append({
+            "Estado": e["nombre"],
+            f"T ({output_units['T']})": f"{from_SI('T', e['T'], output_units['T']):.5g}",
+            f"P ({output_units['P']})": f"{from_SI('P', e['P'], output_units['P']):.5g}",
+            f"h ({output_units['h']})": f"{from_SI('h', e['h'], output_units['h']):.5g}",
+            f"s ({output_units['s']})": f"{from_SI('s', e['s'], output_units['s']):.5g}",
+            "x": f"{e['x']:.4g}" if 0.0 <= e["x"] <= 1.0 else "-",
+        })
+    st.table(filas)
+    for clave in ["q_entrada", "q_salida", "w_entrada", "w_salida"] + indicadores_ciclos[ciclo["tipo"]]:
+        if clave != "exergia_destruida_total":
+            st.write(f"**{etiqueta_indicador(clave)}** = {valor_indicador(clave, ciclo[clave]):.5g}")
+    st.write("**Exergía destruida:**")
+    for componente, valor in ciclo["exergia_destruida"].items():
+        st.write(f"{componente} = {from_SI('exergia', valor, output_units['exergia']):.5g} {output_units['exergia']}")
+    st.write(f"**Total** = {from_SI('exergia', ciclo['exergia_destruida_total'], output_units['exergia']):.5g} {output_units['exergia']}")
+
+@st.fragment
+def seccion_ciclos():
+    panel = st.expander("Ciclos termodinámicos", key="expander_ciclos", on_change="rerun")
+    if not panel.open:
+        return
+    with panel:
+        import ciclos
+
+        nombre_ciclo = st.selectbox("Tipo de ciclo", list(parametros_ciclos))
+        tipo, especificacion = parametros_ciclos[nombre_ciclo]
+
+        # Parámetros en las unidades de entrada (la unidad va en la clave para
+        # que el valor por defecto se reconvierta al cambiarla)
+        parametros = {}
+        for clave, etiqueta, magnitud, defecto, _ in especificacion:
+            if magnitud:
+                unidad = input_units[magnitud]
+                valor = st.number_input(f"{etiqueta} ({unidad})", value=float(from_SI(magnitud, defecto, unidad)),
+                                        key=f"ciclo_{tipo}_{clave}_{unidad}")
+                parametros[clave] = to_SI(magnitud, valor, unidad)
+            else:
+                parametros[clave] = st.number_input(etiqueta, value=defecto, key=f"ciclo_{tipo}_{clave}")
+        parametros["T0"] = T_ref + 273.15
+
+        if st.button(f"Calcular ciclo con {fluido_seleccionado}"):
+            try:
+                st.session_state['ciclo'] = ciclos.evaluar(tipo, fluido_cp, **parametros)
+            except Exception as e:
+                st.session_state['ciclo'] = None
+                st.error(f"No se pudo resolver el ciclo: {e}")
+        ciclo = st.session_state.get('ciclo')
+        if ciclo and ciclo["tipo"] == tipo:
+            mostrar_ciclo(ciclo)
+
+        # Estudio paramétrico: un parámetro variable para uno o varios fluidos
+        st.subheader("Estudio paramétrico")
+        especificacion_por_clave = {e[0]: e for e in especificacion}
+        parametro = st.selectbox("Parámetro a variar", list(especificacion_por_clave),
+                                 format_func=lambda k: especificacion_por_clave[k][1], key=f"barrido_parametro_{tipo}")
+        _, etiqueta, magnitud, _, (desde_SI, hasta_SI) = especificacion_por_clave[parametro]
+        unidad = input_units[magnitud] if magnitud else ""
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            desde = st.number_input(f"Desde {unidad}", value=float(from_SI(magnitud, desde_SI, unidad)),
+                                    key=f"barrido_desde_{tipo}_{parametro}_{unidad}")
+        with col2:
+            hasta = st.number_input(f"Hasta {unidad}", value=float(from_SI(magnitud, hasta_SI, unidad)),
+                                    key=f"barrido_hasta_{tipo}_{parametro}_{unidad}")
+        with col3:
+            n_puntos = st.number_input("Puntos", min_value=2, max_value=5000, value=50, step=10)
+        fluidos_barrido = st.multiselect("Fluidos", [f for f in fluido_lista_organizada if f in fluidos],
+                                         default=[fluido_seleccionado] if fluido_seleccionado in fluidos else [])
+
+        if st.button("Ejecutar estudio") and fluidos_barrido:
+            valores = np.linspace(desde, hasta, int(n_puntos))
+            valores_SI = [to_SI(magnitud, v, unidad) if magnitud else float(v) for v in valores]
+            with st.spinner("Evaluando variantes..."):
+                resultados = ciclos.barrido(tipo, parametro, valores_SI, [fluidos[f] for f in fluidos_barrido],
+                                            base=parametros)
+            st.session_state['barrido'] = {
+                "tipo": tipo, "parametro": parametro, "valores_SI": valores_SI,
+                "resultados": {f: resultados[fluidos[f]] for f in fluidos_barrido},
+            }
+
+        barrido = st.session_state.get('barrido')
+        if barrido and barrido["tipo"] == tipo:
+            import plotly.graph_objects as go
+
+            indicador = st.selectbox("Indicador", indicadores_ciclos[tipo], format_func=etiqueta_indicador)
+            _, etiqueta, magnitud, _, _ = especificacion_por_clave[barrido["parametro"]]
+            unidad = output_units[magnitud] if magnitud else ""
+            x = [from_SI(magnitud, v, unidad) if magnitud else v for v in barrido["valores_SI"]]
+            fig = go.Figure()
+            for nombre, resultados in barrido["resultados"].items():
+                y = [valor_indicador(indicador, r[indicador]) if r is not None else None for r in resultados]
+                fig.add_trace(go.Scatter(x=x, y=y, mode='lines', name=nombre))
+            fig.update_layout(xaxis_title=f"{etiqueta} ({unidad})" if unidad else etiqueta,
+                              yaxis_title=etiqueta_indicador(indicador))
+            st.plotly_chart(fig, width="stretch")
+            sin_solucion = sum(r is None for resultados in barrido["resultados"].values() for r in resultados)
+            if sin_solucion:
+                st.info(f"{sin_solucion} variantes sin solución (fuera del rango del fluido o con "
+                        f"reservorios que no permiten el intercambio de calor)")
+
+seccion_ciclos()
+
+# === Sección de contacto plegable ===
+with st.expander("Contacto"):
+    st.write("**Creador:** Greco Agustin")
+    st.write("**Contacto:** pvt.student657@passfwd.com")
+    st.markdown("###### Si encuentra algún bug, error o inconsistencia en los valores, o tiene sugerencias para mejorar la aplicación, por favor contacte al correo indicado para realizar la corrección.")
+
+# Precalentamiento al final del script, con la página ya dibujada: cargar
+# CoolProp retiene el GIL y no debe demorar la primera respuesta
+if fluidos_precalentar:
+    iniciar_precalentamiento(tuple(fluidos_precalentar))
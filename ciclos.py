@@ -0,0 +1,272 @@
+"""
+Ciclos termodinámicos: Rankine, refrigeración / bomba de calor y Brayton.
+
+Cada ciclo calcula en una sola llamada todos sus estados, los calores y
+trabajos específicos, la eficiencia o el COP y la exergía destruida en cada
+componente. Todo está en SI (K, Pa, J/kg, J/kgK).
+
+`barrido` evalúa estudios paramétricos (por ejemplo eficiencia vs presión de
+caldera para varios fluidos) repartiendo las variantes en un pool de procesos
+y guardando los resultados en caché.
+
+Este módulo no depende de Streamlit para que los procesos del pool puedan
+importarlo sin ejecutar la app.
+"""
+import threading
+from collections import OrderedDict
+
+import CoolProp.CoolProp as CP
+
+import paralelo
+import pool_estados
+
+T0_defecto = 288.15
+# Diferencia entre el espacio refrigerado y la evaporación si no se indica
+# la temperatura del espacio frío
+delta_T_espacio_frio = 10.0
+
+# === Estados ===
+def estado(fluid, par, v1, v2, nombre=""):
+    """Resuelve un estado con un par de entrada nativo de CoolProp."""
+    with pool_estados.prestar(fluid) as AS:
+        AS.update(par, v1, v2)
+        return {"nombre": nombre, "T": AS.T(), "P": AS.p(), "h": AS.hmass(),
+                "s": AS.smass(), "x": AS.Q(), "rho": AS.rhomass()}
+
+def _salida_adiabatica(fluid, entrada, P_salida, eta, compresion):
+    """Estado a la salida de una máquina adiabática con rendimiento isentrópico."""
+    h_s = estado(fluid, CP.PSmass_INPUTS, P_salida, entrada["s"])["h"]
+    if compresion:
+        h = entrada["h"] + (h_s - entrada["h"]) / eta
+    else:
+        h = entrada["h"] - eta * (entrada["h"] - h_s)
+    return estado(fluid, CP.HmassP_INPUTS, h, P_salida)
+
+def _verificar_reservorio(T_reservorio, T_fluido, recibe, nombre):
+    """El calor solo pasa del más caliente al más frío: lanza ValueError si el
+    reservorio está del lado equivocado de la temperatura del fluido."""
+    if (T_reservorio < T_fluido) if recibe else (T_reservorio > T_fluido):
+        raise ValueError(f"La temperatura del {nombre} ({T_reservorio:.2f} K) no permite el intercambio "
+                         f"de calor con el fluido a {T_fluido:.2f} K")
+
+def _exergia_destruida(T0, s_entrada, s_salida, q=0.0, T_reservorio=None):
+    """T0·s_gen de un componente; q > 0 es calor recibido del reservorio."""
+    s_gen = s_salida - s_entrada
+    if q and T_reservorio:
+        s_gen -= q / T_reservorio
+    return T0 * s_gen
+
+# === Ciclos ===
+def ciclo_rankine(fluid, P_alta, P_baja, T_turbina=None, eta_turbina=1.0, eta_bomba=1.0,
+                  T0=T0_defecto, T_fuente=None, T_sumidero=None):
+    """Ciclo Rankine simple. Sin `T_turbina` la turbina recibe vapor saturado.
+
+    `T_fuente` es la temperatura de la fuente de calor de la caldera (por
+    defecto la de entrada a la turbina, la mínima posible) y `T_sumidero` la
+    del medio al que descarga el condensador (por defecto el ambiente T0).
+    """
+    e1 = estado(fluid, CP.PQ_INPUTS, P_baja, 0, "1 Salida condensador")
+    e2 = _salida_adiabatica(fluid, e1, P_alta, eta_bomba, compresion=True)
+    e2["nombre"] = "2 Salida bomba"
+    if T_turbina is None:
+        e3 = estado(fluid, CP.PQ_INPUTS, P_alta, 1, "3 Entrada turbina")
+    else:
+        e3 = estado(fluid, CP.PT_INPUTS, P_alta, T_turbina, "3 Entrada turbina")
+    e4 = _salida_adiabatica(fluid, e3, P_baja, eta_turbina, compresion=False)
+    e4["nombre"] = "4 Salida turbina"
+
+    w_bomba = e2["h"] - e1["h"]
+    w_turbina = e3["h"] - e4["h"]
+    q_entrada = e3["h"] - e2["h"]
+    q_salida = e4["h"] - e1["h"]
+    T_fuente = T_fuente or e3["T"]
+    T_sumidero = T_sumidero or T0
+    _verificar_reservorio(T_fuente, e3["T"], True, "fuente")
+    _verificar_reservorio(T_sumidero, e1["T"], False, "sumidero")
+    destruida = {
+        "bomba": _exergia_destruida(T0, e1["s"], e2["s"]),
+        "caldera": _exergia_destruida(T0, e2["s"], e3["s"], q_entrada, T_fuente),
+        "turbina": _exergia_destruida(T0, e3["s"], e4["s"]),
+        "condensador": _exergia_destruida(T0, e4["s"], e1["s"], -q_salida, T_sumidero),
+    }
+    return {
+        "tipo": "rankine", "fluido": fluid, "estados": [e1, e2, e3, e4],
+        "q_entrada": q_entrada, "q_salida": q_salida,
+        "w_entrada": w_bomba, "w_salida": w_turbina, "w_neto": w_turbina - w_bomba,
+        "eficiencia": (w_turbina - w_bomba) / q_entrada,
+        "exergia_destruida": destruida,
+        "exergia_destruida_total": sum(destruida.values()),
+    }
+
+def ciclo_refrigeracion(fluid, T_evap, T_cond, sobrecalentamiento=0.0, subenfriamiento=0.0,
+                        eta_compresor=1.0, T0=T0_defecto, T_frio=None, T_caliente=None):
+    """Ciclo de compresión de vapor; sirve como refrigerador o bomba de calor.
+
+    `T_frio` es la temperatura del espacio del que se extrae calor (por
+    defecto `delta_T_espacio_frio` sobre la evaporación) y `T_caliente` la del
+    medio que recibe el calor del condensador (por defecto el ambiente T0).
+    """
+    P_evap = estado(fluid, CP.QT_INPUTS, 1, T_evap)["P"]
+    P_cond = estado(fluid, CP.QT_INPUTS, 0, T_cond)["P"]
+    if sobrecalentamiento > 0:
+        e1 = estado(fluid, CP.PT_INPUTS, P_evap, T_evap + sobrecalentamiento, "1 Entrada compresor")
+    else:
+        e1 = estado(fluid, CP.PQ_INPUTS, P_evap, 1, "1 Entrada compresor")
+    e2 = _salida_adiabatica(fluid, e1, P_cond, eta_compresor, compresion=True)
+    e2["nombre"] = "2 Salida compresor"
+    if subenfriamiento > 0:
+        e3 = estado(fluid, CP.PT_INPUTS, P_cond, T_cond - subenfriamiento, "3 Salida condensador")
+    else:
+        e3 = estado(fluid, CP.PQ_INPUTS, P_cond, 0, "3 Salida condensador")
+    e4 = estado(fluid, CP.HmassP_INPUTS, e3["h"], P_evap, "4 Salida válvula")
+
+    w_compresor = e2["h"] - e1["h"]
+    q_frio = e1["h"] - e4["h"]
+    q_caliente = e2["h"] - e3["h"]
+    T_frio = T_frio or T_evap + delta_T_espacio_frio
+    T_caliente = T_caliente or T0
+    _verificar_reservorio(T_frio, e1["T"], True, "espacio frío")
+    _verificar_reservorio(T_caliente, e3["T"], False, "sumidero")
+    destruida = {
+        "compresor": _exergia_destruida(T0, e1["s"], e2["s"]),
+        "condensador": _exergia_destruida(T0, e2["s"], e3["s"], -q_caliente, T_caliente),
+        "valvula": _exergia_destruida(T0, e3["s"], e4["s"]),
+        "evaporador": _exergia_destruida(T0, e4["s"], e1["s"], q_frio, T_frio),
+    }
+    return {
+        "tipo": "refrigeracion", "fluido": fluid, "estados": [e1, e2, e3, e4],
+        "q_entrada": q_frio, "q_salida": q_caliente,
+        "w_entrada": w_compresor, "w_salida": 0.0, "w_neto": -w_compresor,
+        "COP_refrigeracion": q_frio / w_compresor,
+        "COP_bomba_calor": q_caliente / w_compresor,
+        "exergia_destruida": destruida,
+        "exergia_destruida_total": sum(destruida.values()),
+    }
+
+def ciclo_brayton(fluid, P_baja, relacion_presiones, T_compresor, T_turbina, eta_compresor=1.0,
+                  eta_turbina=1.0, T0=T0_defecto, T_fuente=None, T_sumidero=None):
+    """Ciclo Brayton cerrado simple con el fluido real de CoolProp.
+
+    `T_fuente` y `T_sumidero` son las temperaturas de la fuente del calentador
+    (por defecto la de entrada a la turbina) y del medio al que descarga el
+    enfriador (por defecto el ambiente T0).
+    """
+    P_alta = P_baja * relacion_presiones
+    e1 = estado(fluid, CP.PT_INPUTS, P_baja, T_compresor, "1 Entrada compresor")
+    e2 = _salida_adiabatica(fluid, e1, P_alta, eta_compresor, compresion=True)
+    e2["nombre"] = "2 Salida compresor"
+    e3 = estado(fluid, CP.PT_INPUTS, P_alta, T_turbina, "3 Entrada turbina")
+    e4 = _salida_adiabatica(fluid, e3, P_baja, eta_turbina, compresion=False)
+    e4["nombre"] = "4 Salida turbina"
+
+    w_compresor = e2["h"] - e1["h"]
+    w_turbina = e3["h"] - e4["h"]
+    q_entrada = e3["h"] - e2["h"]
+    q_salida = e4["h"] - e1["h"]
+    T_fuente = T_fuente or e3["T"]
+    T_sumidero = T_sumidero or T0
+    _verificar_reservorio(T_fuente, e3["T"], True, "fuente")
+    _verificar_reservorio(T_sumidero, e1["T"], False, "sumidero")
+    destruida = {
+        "compresor": _exergia_destruida(T0, e1["s"], e2["s"]),
+        "calentador": _exergia_destruida(T0, e2["s"], e3["s"], q_entrada, T_fuente),
+        "turbina": _exergia_destruida(T0, e3["s"], e4["s"]),
+        "enfriador": _exergia_destruida(T0, e4["s"], e1["s"], -q_salida, T_sumidero),
+    }
+    return {
+        "tipo": "brayton", "fluido": fluid, "estados": [e1, e2, e3, e4],
+        "q_entrada": q_entrada, "q_salida": q_salida,
+        "w_entrada": w_compresor, "w_salida": w_turbina, "w_neto": w_turbina - w_compresor,
+        "eficiencia": (w_turbina - w_compresor) / q_entrada,
+        "relacion_trabajo_retroceso": w_compresor / w_turbina,
+        "exergia_destruida": destruida,
+        "exergia_destruida_total": sum(destruida.values()),
+    }
+
+ciclos = {
+    "rankine": ciclo_rankine,
+    "refrigeracion": ciclo_refrigeracion,
+    "brayton": ciclo_brayton,
+}
+
+# === Caché de resultados ===
+tamano_cache = 20000
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _clave(tipo, fluid, parametros):
+    return (tipo, fluid, tuple(sorted(parametros.items())))
+
+def _evaluar_variante(variante):
+    """Evalúa (tipo, fluido, parametros); None si el ciclo no tiene solución."""
+    tipo, fluid, parametros = variante
+    try:
+        return ciclos[tipo](fluid, **parametros)
+    except Exception:
+        return None
+
+def evaluar(tipo, fluid, **parametros):
+    """Evalúa un ciclo usando la caché. Lanza la excepción de CoolProp si falla."""
+    clave = _clave(tipo, fluid, parametros)
+    with _cache_lock:
+        if clave in _cache:
+            _cache.move_to_end(clave)
+            return _cache[clave]
+    resultado = ciclos[tipo](fluid, **parametros)
+    _guardar(clave, resultado)
+    return resultado
+
+def _guardar(clave, resultado):
+    with _cache_lock:
+        _cache[clave] = resultado
+        _cache.move_to_end(clave)
+        while len(_cache) > tamano_cache:
+            _cache.popitem(last=False)
+
+# === Estudios paramétricos ===
+# Un proceso evalúa del orden de miles de variantes por segundo y arrancar el
+# pool cuesta segundos (cada proceso importa CoolProp), así que por debajo de
+# este número de variantes se evalúa en el propio proceso
+minimo_paralelo = 1000
+
+def barrido(tipo, parametro, valores, fluidos, base=None, procesos=None):
+    """Evalúa el ciclo `tipo` variando `parametro` sobre `valores` para cada
+    fluido de `fluidos`, con el resto de parámetros tomados de `base`.
+
+    Devuelve {fluido: [resultado o None, ...]} en el orden de `valores`. Las
+    variantes que no están en caché se evalúan en el pool de procesos (o en
+    este proceso si son pocas o `procesos == 1`).
+    """
+    base = dict(base or {})
+    variantes = []
+    for fluid in fluidos:
+        for valor in valores:
+            parametros = dict(base)
+            parametros[parametro] = valor
+            variantes.append((tipo, fluid, parametros))
+
+    resultados = {}
+    pendientes = []
+    with _cache_lock:
+        for variante in variantes:
+            clave = _clave(*variante)
+            if clave in _cache:
+                resultados[clave] = _cache[clave]
+            else:
+                pendientes.append(variante)
+
+    if len(pendientes) < minimo_paralelo or procesos == 1:
+        calculados = map(_evaluar_variante, pendientes)
+    else:
+        pool = paralelo.obtener_pool(procesos)
+        chunksize = max(1, len(pendientes) // (4 * paralelo.procesos_pool()))
+        calculados = pool.map(_evaluar_variante, pendientes, chunksize=chunksize)
+    for variante, resultado in zip(pendientes, calculados):
+        clave = _clave(*variante)
+        resultados[clave] = resultado
+        _guardar(clave, resultado)
+
+    salida = {fluid: [] for fluid in fluidos}
+    for variante in variantes:
+        salida[variante[1]].append(resultados[_clave(*variante)])
+    return salida
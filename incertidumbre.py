@@ -0,0 +1,165 @@
+"""
+Propagación de incertidumbre por Monte Carlo.
+
+Cada entrada medida se describe con una distribución alrededor de su valor
+(normal con desvío σ, o uniforme / triangular con semiancho ±a) y las salidas
+se evalúan sobre miles de muestras. Cada muestra se resuelve y se evalúa con
+`propiedades`, igual que en la calculadora, así que una misma entrada da la
+misma salida en los dos modos. Lo que cambia es el costo por muestra: las
+muestras se reparten en bloques que usan un único AbstractState y, con muchas
+muestras, se evalúan en el pool de procesos compartido, como los mapas de
+propiedades.
+
+Todo está en SI.
+"""
+from concurrent.futures import as_completed
+
+import numpy as np
+
+import inversion
+import paralelo
+import pool_estados
+import propiedades
+
+# Distribuciones disponibles y qué representa el ancho que se ingresa
+distribuciones = {"Normal": "σ", "Uniforme": "±", "Triangular": "±"}
+
+# Backends de CoolProp (ver mapas.backends). Los pares no nativos se
+# resuelven siempre con HEOS: el solver de `inversion` usa sus derivadas
+backends = ["HEOS", "BICUBIC&HEOS"]
+
+# Por debajo de este número de muestras no compensa enviar trabajo al pool
+minimo_paralelo = 2000
+
+# Percentiles que se informan
+percentiles = [2.5, 50, 97.5]
+
+# Salidas numéricas de `propiedades` (el estado termodinámico se resume con
+# la fracción de muestras en cada fase)
+salidas_soportadas = [k for k in propiedades.salidas_disponibles if k != "estado_termodinamico"]
+
+# Nombre de la fase de cada muestra (índices de CoolProp)
+def nombres_fases():
+    import CoolProp.CoolProp as CP
+    return {
+        CP.iphase_liquid: "Líquido",
+        CP.iphase_gas: "Vapor",
+        CP.iphase_twophase: "Mezcla líquido-vapor",
+        CP.iphase_supercritical: "Supercrítico",
+        CP.iphase_supercritical_gas: "Supercrítico",
+        CP.iphase_supercritical_liquid: "Supercrítico",
+    }
+
+# === Muestreo ===
+def muestrear(valor, distribucion, ancho, n, rng, relativa=False):
+    """`n` muestras de la entrada `valor` (en cualquier unidad lineal).
+
+    `ancho` es el desvío σ (Normal) o el semiancho ±a (Uniforme, Triangular);
+    con `relativa` se interpreta como porcentaje de |valor|.
+    """
+    if relativa:
+        ancho = abs(valor) * ancho / 100.0
+    if ancho <= 0:
+        return np.full(n, float(valor))
+    if distribucion == "Normal":
+        return rng.normal(valor, ancho, n)
+    if distribucion == "Uniforme":
+        return rng.uniform(valor - ancho, valor + ancho, n)
+    if distribucion == "Triangular":
+        return rng.triangular(valor - ancho, valor, valor + ancho, n)
+    raise ValueError(f"Distribución desconocida: {distribucion}")
+
+# === Evaluación ===
+def evaluar_bloque(fluid, prop1, vals1, prop2, vals2, salidas, backend="HEOS", T0=288.15, P0=101325.0):
+    """Evalúa las `salidas` para cada par de muestras (vals1[i], vals2[i]).
+
+    Devuelve {salida: arreglo} con NaN donde la muestra no tiene solución y
+    la fase de CoolProp de cada muestra en "fase" (-1 si no se resolvió).
+    """
+    n = len(vals1)
+    Z = {k: np.full(n, np.nan) for k in salidas}
+    fases = np.full(n, -1, dtype=np.int8)
+    with pool_estados.prestar(fluid, backend) as estado:
+        for i in range(n):
+            try:
+                propiedades.resolver_estado(estado, prop1, vals1[i], prop2, vals2[i], fluid)
+                fases[i] = estado.phase()
+            except Exception:
+                continue
+            for k, valor in propiedades.leer_salidas(estado, fluid, salidas, T0, P0).items():
+                if valor is not None:
+                    Z[k][i] = valor
+    Z["fase"] = fases
+    return Z
+
+def _evaluar_bloque(args):
+    inicio, fluid, prop1, vals1, prop2, vals2, salidas, backend, T0, P0 = args
+    return inicio, evaluar_bloque(fluid, prop1, vals1, prop2, vals2, salidas, backend, T0, P0)
+
+def evaluar_muestras(fluid, prop1, vals1, prop2, vals2, salidas, backend="HEOS",
+                     T0=288.15, P0=101325.0, tamano_bloque=None, procesos=None):
+    """Evalúa las `salidas` sobre las muestras de entrada (arreglos en SI).
+
+    Devuelve un iterador de (muestra_inicial, bloque) en el orden en que
+    terminan los bloques; cada bloque es {salida: arreglo} más "fase".
+    `T0`, `P0` son el estado de referencia de la exergía.
+    """
+    vals1 = np.asarray(vals1, dtype=float)
+    vals2 = np.asarray(vals2, dtype=float)
+    if not inversion.es_nativo(prop1, prop2):
+        backend = "HEOS"
+    salidas = [k for k in salidas if k in salidas_soportadas]
+
+    n = len(vals1)
+    paralelo_activo = n >= minimo_paralelo and procesos != 1
+    if tamano_bloque is None:
+        # Bloques chicos para que el progreso avance y el pool quede balanceado
+        tamano_bloque = max(50, n // 50)
+    tareas = [(inicio, fluid, prop1, vals1[inicio:inicio + tamano_bloque], prop2,
+               vals2[inicio:inicio + tamano_bloque], salidas, backend, T0, P0)
+              for inicio in range(0, n, tamano_bloque)]
+
+    futuros = []
+    if paralelo_activo:
+        pool = paralelo.obtener_pool(procesos)
+        futuros = [pool.submit(_evaluar_bloque, t) for t in tareas]
+        terminados = (f.result() for f in as_completed(futuros))
+    else:
+        terminados = map(_evaluar_bloque, tareas)
+    try:
+        yield from terminados
+    finally:
+        # Igual que en `mapas.generar_mapa`: si se abandona el generador se
+        # liberan los bloques que todavía no empezaron
+        for f in futuros:
+            f.cancel()
+
+# === Estadísticos ===
+def resumen(valores):
+    """Media, desvío estándar y `percentiles` de las muestras válidas.
+
+    Devuelve None si ninguna muestra tiene valor.
+    """
+    valores = np.asarray(valores, dtype=float)
+    valores = valores[np.isfinite(valores)]
+    if not len(valores):
+        return None
+    return {
+        "media": float(valores.mean()),
+        "desvio": float(valores.std(ddof=1)) if len(valores) > 1 else 0.0,
+        "percentiles": dict(zip(percentiles, np.percentile(valores, percentiles).tolist())),
+        "validas": len(valores),
+    }
+
+def fracciones_fases(fases):
+    """Fracción de las muestras resueltas en cada fase, por nombre."""
+    fases = np.asarray(fases)
+    resueltas = fases[fases >= 0]
+    if not len(resueltas):
+        return {}
+    nombres = nombres_fases()
+    fracciones = {}
+    for codigo, cantidad in zip(*np.unique(resueltas, return_counts=True)):
+        nombre = nombres.get(int(codigo), "Otra")
+        fracciones[nombre] = fracciones.get(nombre, 0.0) + cantidad / len(resueltas)
+    return fracciones
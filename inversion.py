@@ -0,0 +1,405 @@
+"""
+Pares de entrada que CoolProp no resuelve con un flash nativo (T–h, T–u,
+h–u, s–u y h/s/u con x).
+
+Se reducen a flashes nativos:
+
+- Pares con x: Newton en T sobre el flash (x, T), con la derivada a lo largo
+  de la saturación que da la ecuación de estado.
+- T con h o u dentro de la campana (fluidos puros): un flash (x, T) con la
+  calidad de la regla de la palanca.
+- El resto: Newton en (T, ln ρ) sobre el flash (ρ, T), con el jacobiano
+  analítico de la ecuación de estado (first_partial_deriv en una fase; dentro
+  de la campana se arma a partir de las derivadas de saturación).
+
+El punto de partida es el estado más cercano a los valores pedidos entre una
+tabla de estados del fluido (grilla T–ρ y saturación, calculada una vez por
+fluido) y los últimos estados resueltos. Cada resolución hace como máximo
+`max_iteraciones` pasos de Newton con `max_reducciones` reducciones de paso
+desde cada uno de los `intentos` estados de partida más cercanos, así que el
+número de flashes está acotado.
+
+En mezclas solo se resuelven estados de una fase: el equilibrio de fases de
+una mezcla es demasiado caro para usarlo dentro de la iteración, así que se
+itera con la fase impuesta y la raíz se acepta solo si un flash (P, T) sin
+fase impuesta la confirma como el estado estable.
+"""
+import collections
+import functools
+import math
+import threading
+
+import numpy as np
+
+import mezclas
+import pool_estados
+
+pares_no_nativos = {frozenset(par) for par in [
+    ("T", "h"), ("T", "u"), ("h", "u"), ("s", "u"), ("h", "x"), ("s", "x"), ("u", "x"),
+]}
+
+magnitudes = ["T", "P", "h", "s", "u", "rho"]
+# Se comparan en escala logarítmica al buscar el estado inicial
+magnitudes_log = ["P", "rho"]
+# Escalas típicas en SI para adimensionalizar los residuos y las distancias
+escalas = {"T": 100.0, "P": 1e5, "h": 1e5, "s": 100.0, "u": 1e5, "rho": 1.0}
+
+max_iteraciones = 30
+max_reducciones = 6
+intentos = 3
+tolerancia = 1e-9
+
+def es_nativo(prop1, prop2):
+    return frozenset((prop1, prop2)) not in pares_no_nativos
+
+def _indice(prop):
+    import CoolProp.CoolProp as CP
+    return {"T": CP.iT, "P": CP.iP, "h": CP.iHmass, "s": CP.iSmass,
+            "u": CP.iUmass, "rho": CP.iDmass, "x": CP.iQ}[prop]
+
+def _leer(estado, prop):
+    if prop == "T":
+        return estado.T()
+    if prop == "P":
+        return estado.p()
+    if prop == "h":
+        return estado.hmass()
+    if prop == "s":
+        return estado.smass()
+    if prop == "u":
+        return estado.umass()
+    if prop == "rho":
+        return estado.rhomass()
+    return estado.Q()
+
+# === Estados de partida ===
+@functools.lru_cache(maxsize=64)
+def tabla_estados(fluid):
+    """Estados de referencia del fluido para elegir el punto de partida.
+
+    Devuelve {"estados": {magnitud: arreglo}, "saturacion": {...} o None,
+    "T_r": T de reducción, "rho_r": ρ de reducción}. La grilla T–ρ cubre
+    líquido, vapor, supercrítico y (en fluidos puros) la campana.
+    """
+    import CoolProp.CoolProp as CP
+    mezcla = mezclas.es_mezcla(fluid)
+    with pool_estados.prestar(fluid) as estado:
+        T_r = estado.T_reducing()
+        rho_r = estado.rhomass_reducing()
+        try:
+            T_min, T_max = estado.Tmin(), estado.Tmax()
+        except Exception:
+            T_min, T_max = 0.4 * T_r, 3.0 * T_r
+        if mezcla:
+            estado.specify_phase(CP.iphase_gas)
+        columnas = {m: [] for m in magnitudes}
+        try:
+            for T in np.geomspace(max(T_min, 0.3 * T_r), min(T_max, 4.0 * T_r), 64):
+                for rho in np.geomspace(1e-4 * rho_r, 3.5 * rho_r, 64):
+                    try:
+                        estado.update(CP.DmassT_INPUTS, rho, T)
+                        valores = [_leer(estado, m) for m in magnitudes]
+                        # Con la fase impuesta la grilla de una mezcla incluye
+                        # puntos inestables entre las espinodales: no sirven de partida
+                        if mezcla and estado.first_partial_deriv(CP.iP, CP.iDmass, CP.iT) <= 0:
+                            continue
+                    except Exception:
+                        continue
+                    if valores[1] > 0 and all(math.isfinite(v) for v in valores):
+                        for m, v in zip(magnitudes, valores):
+                            columnas[m].append(v)
+        finally:
+            if mezcla:
+                estado.unspecify_phase()
+
+        saturacion = None
+        if not mezcla:
+            saturacion = {"T": []}
+            for m in magnitudes:
+                saturacion[m + "_l"] = []
+                saturacion[m + "_v"] = []
+            T_sat_min = max(T_min, estado.Ttriple())
+            for T in np.linspace(T_sat_min, T_r, 80)[:-1]:
+                try:
+                    fila = {}
+                    for q, lado in ((0, "_l"), (1, "_v")):
+                        estado.update(CP.QT_INPUTS, q, T)
+                        for m in magnitudes:
+                            fila[m + lado] = _leer(estado, m)
+                except Exception:
+                    continue
+                saturacion["T"].append(T)
+                for k, v in fila.items():
+                    saturacion[k].append(v)
+            saturacion = {k: np.array(v) for k, v in saturacion.items()}
+
+    return {"estados": {m: np.array(v) for m, v in columnas.items()},
+            "saturacion": saturacion, "T_r": T_r, "rho_r": rho_r}
+
+# Últimos estados resueltos por fluido: (T, ρ, {magnitud: valor})
+tamano_resueltos = 64
+_resueltos = {}
+_resueltos_lock = threading.Lock()
+
+def _guardar_resuelto(fluid, estado):
+    valores = {m: _leer(estado, m) for m in magnitudes}
+    with _resueltos_lock:
+        if fluid not in _resueltos and len(_resueltos) >= 64:
+            _resueltos.pop(next(iter(_resueltos)))
+        _resueltos.setdefault(fluid, collections.deque(maxlen=tamano_resueltos)).append(valores)
+
+def _coordenada(m, valores):
+    valores = np.asarray(valores, dtype=float)
+    return np.log(np.maximum(valores, 1e-300)) if m in magnitudes_log else valores / escalas[m]
+
+def estados_iniciales(fluid, prop1, val1, prop2, val2, fase=None, cantidad=1):
+    """Lista de (T, ρ) de los `cantidad` estados conocidos más cercanos a
+    prop1=val1, prop2=val2, del más cercano al más lejano.
+
+    `fase` ('liquido' o 'vapor') restringe la búsqueda a ese lado de la
+    densidad crítica.
+    """
+    tabla = tabla_estados(fluid)
+    with _resueltos_lock:
+        resueltos = list(_resueltos.get(fluid, ()))
+    fuentes = [tabla["estados"]]
+    if tabla["saturacion"] is not None:
+        for lado in ("_l", "_v"):
+            fuentes.append({m: tabla["saturacion"][m + lado] for m in magnitudes})
+    fuentes.append({m: [r[m] for r in resueltos] for m in magnitudes})
+    candidatos = {m: np.concatenate([f[m] for f in fuentes]) for m in magnitudes}
+
+    distancia = np.zeros(len(candidatos["T"]))
+    for prop, val in ((prop1, val1), (prop2, val2)):
+        distancia += (_coordenada(prop, candidatos[prop]) - _coordenada(prop, val)) ** 2
+    if fase == "liquido":
+        distancia[candidatos["rho"] < tabla["rho_r"]] = np.inf
+    elif fase == "vapor":
+        distancia[candidatos["rho"] > tabla["rho_r"]] = np.inf
+    # Los siguientes estados se eligen alejados de los ya elegidos (más de
+    # 10 % en T o un factor 2 en ρ) para que un reintento no repita el camino
+    elegidos = []
+    for i in np.argsort(distancia):
+        if len(elegidos) == cantidad or not math.isfinite(distancia[i]):
+            break
+        T, rho = candidatos["T"][i], candidatos["rho"][i]
+        if all(abs(T - T_e) > 0.1 * T_e or abs(math.log(rho / rho_e)) > math.log(2) for T_e, rho_e in elegidos):
+            elegidos.append((T, rho))
+    if not elegidos:
+        raise ValueError("No hay estados de partida para la fase pedida")
+    return elegidos
+
+# === Newton en (T, ln ρ) ===
+def _jacobiano(estado, sat, props):
+    """Derivadas de `props` respecto de (T, ln ρ) en el estado resuelto."""
+    import CoolProp.CoolProp as CP
+    rho = estado.rhomass()
+    q = estado.Q()
+    if sat is None or not (0.0 <= q <= 1.0):
+        return np.array([[estado.first_partial_deriv(_indice(p), CP.iT, CP.iDmass),
+                          rho * estado.first_partial_deriv(_indice(p), CP.iDmass, CP.iT)] for p in props])
+
+    # Dentro de la campana X = X_l + q (X_v - X_l) con q = (v - v_l) / (v_v - v_l);
+    # X_l, X_v y sus derivadas en T salen de los estados saturados
+    T = estado.T()
+    sat_l = {}
+    sat_v = {}
+    for q_sat, lado in ((0, sat_l), (1, sat_v)):
+        sat.update(CP.QT_INPUTS, q_sat, T)
+        for p in set(props) | {"rho"}:
+            lado[p] = (_leer(sat, p), sat.first_saturation_deriv(_indice(p), CP.iT))
+    v_l, v_v = 1.0 / sat_l["rho"][0], 1.0 / sat_v["rho"][0]
+    dv_l = -sat_l["rho"][1] * v_l ** 2
+    dv_v = -sat_v["rho"][1] * v_v ** 2
+    dq_dT = -((1 - q) * dv_l + q * dv_v) / (v_v - v_l)
+    dq_dlnrho = -(1.0 / rho) / (v_v - v_l)
+    filas = []
+    for p in props:
+        (X_l, dX_l), (X_v, dX_v) = sat_l[p], sat_v[p]
+        filas.append([(1 - q) * dX_l + q * dX_v + (X_v - X_l) * dq_dT, (X_v - X_l) * dq_dlnrho])
+    return np.array(filas)
+
+def _newton_T_rho(estado, fluid, props, objetivos, T, rho):
+    import CoolProp.CoolProp as CP
+    mezcla = mezclas.es_mezcla(fluid)
+
+    def residuo(T, rho):
+        try:
+            estado.update(CP.DmassT_INPUTS, rho, T)
+            r = np.array([(_leer(estado, p) - o) / escalas[p] for p, o in zip(props, objetivos)])
+        except Exception:
+            return None
+        return r if np.all(np.isfinite(r)) else None
+
+    r = residuo(T, rho)
+    if r is None:
+        raise ValueError("El estado inicial no es válido")
+    with pool_estados.prestar(fluid) as sat:
+        for _ in range(max_iteraciones):
+            if np.max(np.abs(r)) < tolerancia:
+                return
+            J = _jacobiano(estado, None if mezcla else sat, props) / np.array([escalas[p] for p in props])[:, None]
+            try:
+                dT, dlnrho = np.linalg.solve(J, -r)
+            except np.linalg.LinAlgError:
+                raise ValueError("Jacobiano singular")
+            # Pasos acotados: como máximo 20 % en T y un factor e en ρ
+            factor = min(1.0, 0.2 * T / abs(dT) if dT else 1.0, 1.0 / abs(dlnrho) if dlnrho else 1.0)
+            norma = np.linalg.norm(r)
+            for _ in range(max_reducciones):
+                T_nuevo = T + factor * dT
+                rho_nuevo = rho * math.exp(factor * dlnrho)
+                r_nuevo = residuo(T_nuevo, rho_nuevo) if T_nuevo > 0 else None
+                if r_nuevo is not None and np.linalg.norm(r_nuevo) < norma:
+                    break
+                factor /= 2
+            else:
+                raise ValueError("Newton no converge")
+            T, rho, r = T_nuevo, rho_nuevo, r_nuevo
+    if np.max(np.abs(r)) >= tolerancia:
+        raise ValueError("Newton no converge")
+
+# === Pares con x: Newton en T a lo largo de la saturación ===
+def _newton_saturacion(estado, fluid, prop, valor, x):
+    import CoolProp.CoolProp as CP
+    if not 0.0 <= x <= 1.0:
+        raise ValueError("La calidad debe estar entre 0 y 1")
+    if mezclas.es_mezcla(fluid):
+        raise ValueError("Par no soportado para mezclas")
+    saturacion = tabla_estados(fluid)["saturacion"]
+    columna = (1 - x) * saturacion[prop + "_l"] + x * saturacion[prop + "_v"]
+    T = saturacion["T"][int(np.argmin(np.abs(columna - valor)))]
+    T_min, T_max = saturacion["T"][0], saturacion["T"][-1]
+    escala = escalas[prop]
+
+    with pool_estados.prestar(fluid) as sat:
+        for _ in range(max_iteraciones):
+            estado.update(CP.QT_INPUTS, x, T)
+            r = (_leer(estado, prop) - valor) / escala
+            if abs(r) < tolerancia:
+                return
+            derivada = 0.0
+            for q_sat, peso in ((0, 1 - x), (1, x)):
+                sat.update(CP.QT_INPUTS, q_sat, T)
+                derivada += peso * sat.first_saturation_deriv(_indice(prop), CP.iT)
+            if derivada == 0:
+                raise ValueError("Derivada nula en la saturación")
+            T = min(max(T - r * escala / derivada, T_min), T_max)
+    raise ValueError("Newton no converge")
+
+def _confirmar_estable(estado):
+    """Comprueba que una raíz de mezcla (hallada con la fase impuesta) sea el
+    estado estable: con (∂P/∂ρ)_T > 0 y reproducida por un flash (P, T) sin
+    fase impuesta, que deja `estado` resuelto en ella."""
+    import CoolProp.CoolProp as CP
+    if estado.first_partial_deriv(CP.iP, CP.iDmass, CP.iT) <= 0:
+        raise ValueError("La solución es mecánicamente inestable")
+    T, P, rho, h = estado.T(), estado.p(), estado.rhomass(), estado.hmass()
+    try:
+        estado.update(CP.PT_INPUTS, P, T)
+    except Exception:
+        raise ValueError("La solución no se confirma con un flash (P, T)")
+    if abs(estado.rhomass() - rho) > 1e-4 * rho or abs(estado.hmass() - h) > 1e-4 * escalas["h"]:
+        raise ValueError("La solución no es el estado estable de la mezcla")
+
+def _verificar_rango(estado):
+    """Lanza ValueError si el estado resuelto está fuera del rango de la
+    ecuación de estado: sobre pmax o del lado sólido de la línea de fusión
+    (de Tmin si el fluido no la tiene o no está definida a esa presión)."""
+    import CoolProp.CoolProp as CP
+    T, P = estado.T(), estado.p()
+    if P > estado.pmax():
+        raise ValueError("La solución supera la presión máxima de la ecuación de estado")
+    try:
+        T_fusion = estado.melting_line(CP.iT, CP.iP, P)
+    except Exception:
+        T_fusion = estado.Tmin()
+    # Tolerancia para no descartar el propio punto de fusión (agua a 0 °C y 1 atm)
+    if T < T_fusion - 0.01:
+        raise ValueError("La solución está en la zona sólida")
+
+def _resolver_en_campana(estado, T, prop, valor):
+    """Si T está bajo la crítica y `valor` (h o u) entre los de líquido y vapor
+    saturados a esa T, resuelve con un único flash (x, T). Devuelve si lo hizo."""
+    import CoolProp.CoolProp as CP
+    try:
+        if T >= estado.T_critical():
+            return False
+        estado.update(CP.QT_INPUTS, 0, T)
+        X_l = _leer(estado, prop)
+        estado.update(CP.QT_INPUTS, 1, T)
+        X_v = _leer(estado, prop)
+    except Exception:
+        return False
+    if not X_l <= valor <= X_v:
+        return False
+    estado.update(CP.QT_INPUTS, (valor - X_l) / (X_v - X_l), T)
+    return True
+
+def resolver(estado, fluid, prop1, val1, prop2, val2, fase=None):
+    """Deja `estado` resuelto con prop1=val1 y prop2=val2 (SI).
+
+    Las propiedades son T, P, h, s, u, rho o x. Con `fase` ('liquido' o
+    'vapor') solo se acepta una solución monofásica de ese lado de la
+    densidad crítica.
+    Lanza ValueError si no hay solución o la iteración no converge.
+    """
+    import CoolProp.CoolProp as CP
+    if "x" in (prop1, prop2):
+        prop, valor, x = (prop2, val2, val1) if prop1 == "x" else (prop1, val1, val2)
+        if prop not in ("h", "s", "u"):
+            raise ValueError(f"Par ({prop1}, {prop2}) no soportado")
+        _newton_saturacion(estado, fluid, prop, valor, x)
+        return
+
+    mezcla = mezclas.es_mezcla(fluid)
+    # T con h o u dentro de la campana: la calidad sale directamente de la
+    # regla de la palanca, sin iterar
+    if not mezcla and fase is None and "T" in (prop1, prop2) and {prop1, prop2} & {"h", "u"}:
+        T, prop, valor = (val1, prop2, val2) if prop1 == "T" else (val2, prop1, val1)
+        if _resolver_en_campana(estado, T, prop, valor):
+            _guardar_resuelto(fluid, estado)
+            return
+
+    # Cerca de la saturación el estado más cercano puede quedar del otro
+    # lado de la curva; si Newton no converge se prueba desde el siguiente
+    for T, rho in estados_iniciales(fluid, prop1, val1, prop2, val2, fase, intentos):
+        try:
+            if mezcla:
+                estado.specify_phase(CP.iphase_gas)
+            try:
+                _newton_T_rho(estado, fluid, [prop1, prop2], [val1, val2], T, rho)
+            finally:
+                if mezcla:
+                    estado.unspecify_phase()
+            if mezcla:
+                _confirmar_estable(estado)
+            _verificar_rango(estado)
+            if fase and (estado.rhomass() > tabla_estados(fluid)["rho_r"]) != (fase == "liquido"):
+                raise ValueError("La solución no está en la fase pedida")
+            # Una mezcla líquido-vapor no es ni líquido ni vapor
+            if fase and 0 <= estado.Q() <= 1:
+                raise ValueError("La solución está dentro de la campana")
+            break
+        except ValueError as e:
+            error = e
+    else:
+        raise error
+    _guardar_resuelto(fluid, estado)
+
+def resolver_par(estado, fluid, prop1, val1, prop2, val2):
+    """Resuelve `estado` con cualquier par: un único flash si CoolProp lo
+    admite y, si no es nativo (o el flash falla), con `resolver`."""
+    import CoolProp.CoolProp as CP
+    if es_nativo(prop1, prop2):
+        try:
+            par, a, b = CP.generate_update_pair(_indice(prop1), val1, _indice(prop2), val2)
+            estado.update(par, a, b)
+            # Los flashes con x (ρ–x, v–x) dejan la fase bifásica impuesta
+            estado.unspecify_phase()
+            return
+        except Exception:
+            # T–P en la saturación no tiene solución única: no tiene sentido iterar
+            if {prop1, prop2} == {"T", "P"}:
+                raise
+    resolver(estado, fluid, prop1, val1, prop2, val2)
@@ -0,0 +1,191 @@
+"""
+Mapas de propiedades sobre una grilla rectangular T–P.
+
+Cada punto se evalúa con `propiedades`, igual que en la calculadora. La
+grilla se divide en bloques de filas (presiones) que se evalúan en el pool
+de procesos compartido; `generar_mapa` devuelve cada bloque apenas termina
+para que la interfaz pueda ir dibujando el mapa. Las grillas completas se
+guardan en disco por (fluido, propiedad, dominio, backend).
+
+Todo está en SI (K, Pa, kg/m3, J/kgK, Pa·s, m/s, J/kg).
+"""
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+
+import paralelo
+import pool_estados
+import propiedades
+
+# Backends de CoolProp: HEOS es la ecuación de estado completa; BICUBIC&HEOS
+# interpola en tablas (mucho más rápido, las tablas se construyen una vez por
+# fluido y proceso; no admite mezclas definidas por composición)
+backends = ["HEOS", "BICUBIC&HEOS"]
+
+# Por debajo de este número de puntos no compensa enviar trabajo al pool
+minimo_paralelo = 20000
+
+def _directorio_cache_por_defecto():
+    """Caché del usuario (XDG_CACHE_HOME, LOCALAPPDATA o ~/.cache) o, si no
+    hay un directorio de usuario, el directorio temporal."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA")
+    if not base:
+        home = os.path.expanduser("~")
+        base = os.path.join(home, ".cache") if os.path.isabs(home) else tempfile.gettempdir()
+    return os.path.join(base, "atd", "mapas")
+
+directorio_cache = os.environ.get("ATD_CACHE_MAPAS") or _directorio_cache_por_defecto()
+
+# Límites de la caché: se borran los mapas sin usar hace más de
+# `antiguedad_maxima_cache` segundos y, si aun así se pasa de
+# `tamano_maximo_cache` bytes, los usados hace más tiempo
+tamano_maximo_cache = int(float(os.environ.get("ATD_CACHE_MAPAS_MB", 200)) * 1024 ** 2)
+antiguedad_maxima_cache = 30 * 24 * 3600
+
+def grilla(T_min, T_max, n_T, P_min, P_max, n_P, escala_P="log"):
+    """Valores de T (lineales) y P (logarítmicos o lineales) de la grilla."""
+    T_vals = np.linspace(T_min, T_max, n_T)
+    if escala_P == "log":
+        P_vals = np.geomspace(P_min, P_max, n_P)
+    else:
+        P_vals = np.linspace(P_min, P_max, n_P)
+    return T_vals, P_vals
+
+def evaluar_bloque(fluid, propiedad, T_vals, P_vals, backend="HEOS", T0=288.15, P0=101325.0):
+    """Evalúa `propiedad` (una salida de `propiedades`) en la grilla P_vals × T_vals.
+
+    NaN donde no hay solución. `T0`, `P0` son la referencia de la exergía.
+    """
+    Z = np.full((len(P_vals), len(T_vals)), np.nan)
+    with pool_estados.prestar(fluid, backend) as estado:
+        for i, P in enumerate(P_vals):
+            for j, T in enumerate(T_vals):
+                try:
+                    propiedades.resolver_estado(estado, "T", T, "P", P, fluid)
+                except Exception:
+                    continue
+                valor = propiedades.leer_salidas(estado, fluid, [propiedad], T0, P0)[propiedad]
+                if valor is not None:
+                    Z[i, j] = valor
+    return Z
+
+def _evaluar_bloque(args):
+    fila, fluid, propiedad, T_vals, P_vals, backend, T0, P0 = args
+    return fila, evaluar_bloque(fluid, propiedad, T_vals, P_vals, backend, T0, P0)
+
+# === Caché en disco ===
+def ruta_cache(fluid, propiedad, T_vals, P_vals, backend, T0, P0):
+    referencia = (T0, P0) if propiedad == "exergia" else None
+    clave = repr((fluid, propiedad, backend, referencia,
+                  float(T_vals[0]), float(T_vals[-1]), len(T_vals),
+                  float(P_vals[0]), float(P_vals[-1]), len(P_vals), float(P_vals[1] - P_vals[0])))
+    nombre = hashlib.sha1(clave.encode("utf-8")).hexdigest()
+    return os.path.join(directorio_cache, f"{propiedad}_{nombre}.npz")
+
+def cargar_mapa(ruta):
+    try:
+        with np.load(ruta) as datos:
+            Z = datos["Z"]
+    except (OSError, KeyError, ValueError):
+        return None
+    # La fecha de modificación marca el último uso (para `limpiar_cache`)
+    try:
+        os.utime(ruta)
+    except OSError:
+        pass
+    return Z
+
+def guardar_mapa(ruta, T_vals, P_vals, Z):
+    # Escritura atómica: otra sesión puede estar leyendo el mismo archivo.
+    # Si el directorio no se puede escribir el mapa simplemente no se guarda
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        fd, temporal = tempfile.mkstemp(prefix=".", suffix=".npz", dir=os.path.dirname(ruta))
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, T=T_vals, P=P_vals, Z=Z)
+        os.replace(temporal, ruta)
+    except OSError:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    limpiar_cache(os.path.dirname(ruta))
+
+def limpiar_cache(directorio=None, tamano_maximo=None, antiguedad_maxima=None):
+    """Borra los mapas viejos y, si la caché supera el tamaño máximo, los
+    usados hace más tiempo hasta quedar por debajo."""
+    directorio = directorio or directorio_cache
+    tamano_maximo = tamano_maximo_cache if tamano_maximo is None else tamano_maximo
+    antiguedad_maxima = antiguedad_maxima_cache if antiguedad_maxima is None else antiguedad_maxima
+    try:
+        nombres = [n for n in os.listdir(directorio) if n.endswith(".npz") and not n.startswith(".")]
+    except OSError:
+        return
+    archivos = []
+    for nombre in nombres:
+        ruta = os.path.join(directorio, nombre)
+        try:
+            info = os.stat(ruta)
+        except OSError:
+            continue
+        archivos.append((info.st_mtime, info.st_size, ruta))
+
+    # Del más reciente al más viejo: se conserva mientras entre en el tamaño
+    archivos.sort(reverse=True)
+    limite = time.time() - antiguedad_maxima
+    total = 0
+    for mtime, tamano, ruta in archivos:
+        total += tamano
+        if mtime < limite or total > tamano_maximo:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+# === Generación ===
+def generar_mapa(fluid, propiedad, T_vals, P_vals, backend="HEOS", T0=288.15, P0=101325.0,
+                 filas_por_bloque=None, procesos=None):
+    """Genera el mapa por bloques de filas.
+
+    Devuelve un iterador de (fila_inicial, bloque) en el orden en que terminan
+    los bloques; si la grilla está en la caché de disco devuelve un único
+    bloque con el mapa completo. Al terminar guarda la grilla en disco.
+    """
+    ruta = ruta_cache(fluid, propiedad, T_vals, P_vals, backend, T0, P0)
+    Z = cargar_mapa(ruta)
+    if Z is not None and Z.shape == (len(P_vals), len(T_vals)):
+        yield 0, Z
+        return
+
+    n_P = len(P_vals)
+    paralelo_activo = len(T_vals) * n_P >= minimo_paralelo and procesos != 1
+    if filas_por_bloque is None:
+        # Bloques chicos para que el mapa se vaya viendo y el pool quede balanceado
+        filas_por_bloque = max(1, n_P // 50)
+    tareas = [(fila, fluid, propiedad, T_vals, P_vals[fila:fila + filas_por_bloque], backend, T0, P0)
+              for fila in range(0, n_P, filas_por_bloque)]
+
+    Z = np.full((n_P, len(T_vals)), np.nan)
+    futuros = []
+    if paralelo_activo:
+        pool = paralelo.obtener_pool(procesos)
+        futuros = [pool.submit(_evaluar_bloque, t) for t in tareas]
+        terminados = (f.result() for f in as_completed(futuros))
+    else:
+        terminados = map(_evaluar_bloque, tareas)
+    try:
+        for fila, bloque in terminados:
+            Z[fila:fila + len(bloque)] = bloque
+            yield fila, bloque
+    finally:
+        # Si la interfaz abandona el generador (rerun o cambio de página) los
+        # bloques que todavía no empezaron no deben seguir ocupando el pool
+        for f in futuros:
+            f.cancel()
+
+    guardar_mapa(ruta, T_vals, P_vals, Z)
@@ -0,0 +1,82 @@
+"""
+Mezclas HEOS definidas por composición (gas natural, refrigerantes
+zeotrópicos, ...).
+
+Una mezcla se identifica con el nombre que entiende PropsSI,
+"Methane[0.9]&Ethane[0.1]", con las fracciones molares normalizadas; ese
+mismo nombre es la clave de caché de su envolvente de fases.
+
+CoolProp se importa dentro de las funciones para no demorar el arranque de
+la app, que importa este módulo al cargar la lista de fluidos.
+"""
+import functools
+import re
+
+# Fracciones molares
+mezclas_predefinidas = {
+    "Gas natural": {"Methane": 0.90, "Ethane": 0.06, "Propane": 0.03, "Nitrogen": 0.01},
+    "R290/R600a (50/50)": {"Propane": 0.5, "IsoButane": 0.5},
+    "R32/R1234yf (50/50)": {"R32": 0.5, "R1234yf": 0.5},
+    "CO2/Metano (50/50)": {"CO2": 0.5, "Methane": 0.5},
+}
+
+def nombre_mezcla(composicion):
+    """Nombre CoolProp de la mezcla a partir de {componente: fracción molar}.
+    Las fracciones se normalizan para que sumen 1."""
+    composicion = {c: x for c, x in composicion.items() if x > 0}
+    total = sum(composicion.values())
+    if len(composicion) < 2 or total <= 0:
+        raise ValueError("Una mezcla necesita al menos dos componentes con fracción positiva")
+    return "&".join(f"{c}[{x / total:.6g}]" for c, x in composicion.items())
+
+def es_mezcla(fluid):
+    return "&" in fluid
+
+def composicion(fluid):
+    """(componentes, fracciones) de un nombre de mezcla."""
+    componentes = []
+    fracciones = []
+    for parte in fluid.split("&"):
+        m = re.fullmatch(r"(.+)\[([^\]]+)\]", parte.strip())
+        if m is None:
+            raise ValueError(f"Componente sin fracción molar: '{parte}'")
+        componentes.append(m.group(1))
+        fracciones.append(float(m.group(2)))
+    return componentes, fracciones
+
+def crear_abstract_state(fluid, backend="HEOS"):
+    """AbstractState de un fluido puro o de una mezcla con su composición."""
+    import CoolProp.CoolProp as CP
+    if not es_mezcla(fluid):
+        return CP.AbstractState(backend, fluid)
+    componentes, fracciones = composicion(fluid)
+    estado = CP.AbstractState(backend, "&".join(componentes))
+    estado.set_mole_fractions(fracciones)
+    return estado
+
+@functools.lru_cache(maxsize=1)
+def componentes_disponibles():
+    import CoolProp.CoolProp as CP
+    return sorted(CP.get_global_param_string("FluidsList").split(","), key=str.lower)
+
+@functools.lru_cache(maxsize=32)
+def envolvente_fases(fluid):
+    """Envolvente de fases de la mezcla en SI (T, P, v, h, s y Q por punto).
+
+    Se construye con el trazador de CoolProp, que es mucho más caro que la
+    saturación de un fluido puro, así que se guarda en caché por composición.
+    Q=0 son puntos de burbuja y Q=1 de rocío; las propiedades son las de la
+    fase con la composición global, que CoolProp guarda en los arreglos *_vap.
+    """
+    estado = crear_abstract_state(fluid)
+    estado.build_phase_envelope("")
+    datos = estado.get_phase_envelope_data()
+    M = estado.molar_mass()
+    return {
+        "Q": tuple(datos.Q),
+        "T": tuple(datos.T),
+        "P": tuple(datos.p),
+        "v": tuple(1.0 / (r * M) for r in datos.rhomolar_vap),
+        "h": tuple(h / M for h in datos.hmolar_vap),
+        "s": tuple(s / M for s in datos.smolar_vap),
+    }
@@ -0,0 +1,30 @@
+"""
+Pool de procesos compartido por los cálculos pesados (estudios paramétricos de
+ciclos, mapas de propiedades).
+
+Se usa 'spawn' porque el servidor de Streamlit tiene varios hilos y hacer fork
+de un proceso así no es seguro. Arrancar el pool cuesta segundos (cada proceso
+importa CoolProp), así que se crea una sola vez y se reutiliza.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_pool = None
+_pool_procesos = 0
+_pool_lock = threading.Lock()
+
+def obtener_pool(procesos=None):
+    """Devuelve el pool compartido, creándolo la primera vez."""
+    global _pool, _pool_procesos
+    with _pool_lock:
+        if _pool is None:
+            _pool_procesos = procesos or os.cpu_count() or 1
+            _pool = ProcessPoolExecutor(max_workers=_pool_procesos,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def procesos_pool():
+    """Número de procesos del pool (0 si todavía no se creó)."""
+    return _pool_procesos
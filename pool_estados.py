@@ -0,0 +1,99 @@
+"""
+Pool de AbstractState de CoolProp compartido por todas las sesiones.
+
+Streamlit atiende cada sesión en su propio hilo. Un AbstractState no se puede
+compartir entre hilos (update() y la lectura de propiedades son llamadas
+separadas), pero sí reutilizar: `prestar` entrega uno libre del mismo
+(backend, fluido), o crea uno nuevo si no hay, y al terminar lo devuelve al
+pool. El lock solo protege las listas de libres, nunca un cálculo.
+
+Un estado vuelve al pool sin fase impuesta (algunos flashes, como el ρ–x, la
+dejan fijada y el siguiente cálculo de otra sesión la heredaría), y si el
+bloque `with` terminó con una excepción se descarta en lugar de devolverlo.
+
+Se guardan como máximo tantos libres por fluido como hilos tiene el proceso,
+y solo de los `maximo_fluidos` fluidos usados más recientemente (las mezclas
+personalizadas pueden generar muchos nombres distintos).
+"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import mezclas
+
+maximo_fluidos = 64
+
+_libres = OrderedDict()
+_lock = threading.Lock()
+
+def maximo_libres():
+    """Estados libres que se guardan por fluido: uno por hilo del proceso."""
+    return max(2, threading.active_count())
+
+@contextmanager
+def prestar(fluid, backend="HEOS"):
+    """Presta un AbstractState de `fluid` durante el bloque `with`."""
+    clave = (backend, fluid)
+    estado = None
+    with _lock:
+        libres = _libres.get(clave)
+        if libres:
+            estado = libres.pop()
+    if estado is None:
+        estado = mezclas.crear_abstract_state(fluid, backend)
+    try:
+        yield estado
+    except Exception:
+        # Un cálculo que falló puede dejar el estado a medio actualizar
+        raise
+    devolver(clave, estado)
+
+def devolver(clave, estado):
+    try:
+        estado.unspecify_phase()
+    except Exception:
+        return
+    with _lock:
+        libres = _libres.setdefault(clave, [])
+        _libres.move_to_end(clave)
+        if len(libres) < maximo_libres():
+            libres.append(estado)
+        while len(_libres) > maximo_fluidos:
+            _libres.popitem(last=False)
+
+def precargar(fluid, backend="HEOS", cantidad=1):
+    """Crea `cantidad` estados de `fluid` y los deja libres en el pool."""
+    for _ in range(cantidad):
+        devolver((backend, fluid), mezclas.crear_abstract_state(fluid, backend))
+
+def cantidad_libres(fluid, backend="HEOS"):
+    """Cantidad de estados libres de `fluid` (para diagnóstico)."""
+    with _lock:
+        return len(_libres.get((backend, fluid), ()))
+
+# === Verificación ===
+def verificar_aislamiento(fluid="Water"):
+    """Comprueba que un cálculo que deja una fase impuesta (ρ–x) no cambie
+    los resultados de los siguientes con estados del pool. Devuelve la lista
+    de diferencias contra un estado nuevo (vacía si no hay)."""
+    import propiedades
+    casos = [("T", 400.0, "P", 2e7), ("T", 300.0, "P", 101325.0),
+             ("T", 400.0, "s", 1500.0), ("T", 400.0, "u", 500000.0)]
+    salidas = ["T", "P", "h", "rho"]
+    propiedades.calcular_propiedades("rho", 4.549, "x", 0.3, fluid)
+    diferencias = []
+    for prop1, val1, prop2, val2 in casos:
+        obtenido = propiedades.calcular_propiedades(prop1, val1, prop2, val2, fluid, salidas)
+        nuevo = mezclas.crear_abstract_state(fluid, "HEOS")
+        propiedades.resolver_estado(nuevo, prop1, val1, prop2, val2, fluid)
+        esperado = propiedades.leer_salidas(nuevo, fluid, salidas)
+        for k in salidas:
+            if obtenido[k] is None or abs(obtenido[k] - esperado[k]) > 1e-6 * max(1.0, abs(esperado[k])):
+                diferencias.append(f"{prop1}={val1}, {prop2}={val2}: {k} = {obtenido[k]} (esperado {esperado[k]})")
+    return diferencias
+
+if __name__ == "__main__":
+    import sys
+    diferencias = verificar_aislamiento()
+    print("\n".join(diferencias) or "Sin diferencias")
+    sys.exit(1 if diferencias else 0)
@@ -0,0 +1,245 @@
+"""
+Evaluación de las propiedades de un estado.
+
+Es el único lugar donde se define cómo se resuelve un estado a partir de dos
+propiedades y cómo se calcula cada salida: la calculadora, los mapas de
+propiedades y la propagación de incertidumbre pasan todos por aquí, así que
+una misma entrada da la misma salida en cualquier modo.
+
+Este módulo no depende de Streamlit para que los procesos del pool puedan
+importarlo sin ejecutar la app. Todo está en SI.
+"""
+import functools
+
+import inversion
+import pool_estados
+
+props = {"T": "T", "P": "P", "h": "H", "s": "S", "u": "U", "rho": "D", "v": "D", "x": "Q"}
+to_return = {"T": "T", "P": "P", "h": "H", "s": "S", "u": "U", "rho": "D", "x": "Q"}
+extra_props = ["vel_sonido", "exergia", "mu", "cp", "cv", "k", "cond", "Pr", "sigma",
+               "kappa_T", "beta", "mu_JT", "dhdP_T", "Z"]
+# Derivadas termodinámicas que se leen de la ecuación de estado (grupo opcional)
+salidas_derivadas = ["kappa_T", "beta", "mu_JT", "dhdP_T", "Z"]
+
+# Estado de referencia de la exergía por defecto (15 °C, 1 atm)
+T0_defecto = 288.15
+P0_defecto = 101325.0
+
+# === Propiedades bajo demanda ===
+# Cada salida se evalúa con una función (estado, fluido, obtener) que recibe el
+# AbstractState ya resuelto y `obtener`, que devuelve otra salida en SI
+# calculándola solo si hace falta (y también el estado de referencia de la
+# exergía, "T0" y "P0"). Así una salida que no se pide (ni la pide
+# otra) no se evalúa nunca: por ejemplo la viscosidad, que es cara y falla en
+# fluidos sin modelo de transporte.
+@functools.lru_cache(maxsize=64)
+def estado_referencia(fluid, T_ref_K, P_ref_Pa):
+    """(h0, s0) del estado de referencia de exergía."""
+    import CoolProp.CoolProp as CP
+    return (CP.PropsSI("H", "T", T_ref_K, "P", P_ref_Pa, fluid),
+            CP.PropsSI("S", "T", T_ref_K, "P", P_ref_Pa, fluid))
+
+def calidad(estado, fluid, obtener):
+    q = estado.Q()
+    if 0.0 <= q <= 1.0:
+        return q
+    # Fuera de la campana: x=0 para líquido subenfriado, x=1 para vapor sobrecalentado
+    estado_termo = obtener("estado_termodinamico")
+    if estado_termo == "Líquido subenfriado":
+        return 0.0
+    if estado_termo == "Vapor sobrecalentado":
+        return 1.0
+    return q
+
+def exergia(estado, fluid, obtener):
+    T0 = obtener("T0")
+    h0, s0 = estado_referencia(fluid, T0, obtener("P0"))
+    return (obtener("h") - h0) - T0 * (obtener("s") - s0)
+
+def tension_superficial(estado, fluid, obtener):
+    import CoolProp.CoolProp as CP
+    if 0.0 <= estado.Q() <= 1.0:
+        return estado.surface_tension()
+    # Fuera de la campana se informa la del líquido saturado a la misma T
+    with pool_estados.prestar(fluid) as sat:
+        sat.update(CP.QT_INPUTS, 0, obtener("T"))
+        return sat.surface_tension()
+
+def derivada_parcial(num, den, cte):
+    """Evaluador de (∂num/∂den)_cte, leída analíticamente de la ecuación de
+    estado ya resuelta (sin diferencias finitas ni flashes extra)."""
+    def evaluar(estado, fluid, obtener):
+        import CoolProp.CoolProp as CP
+        return estado.first_partial_deriv(CP.get_parameter_index(props[num]),
+                                          CP.get_parameter_index(props[den]),
+                                          CP.get_parameter_index(props[cte]))
+    return evaluar
+
+def estado_termodinamico(estado, fluid, obtener):
+    """Determina el estado termodinámico comparando con la saturación."""
+    import CoolProp.CoolProp as CP
+    T_val = obtener("T")
+    P_val = obtener("P")
+    h_val = obtener("h")
+    q = estado.Q()
+
+    # Calcular propiedades de saturación a la presión actual (con otro
+    # estado del pool: el que se recibe ya está resuelto y no se toca)
+    try:
+        with pool_estados.prestar(fluid) as sat:
+            sat.update(CP.PQ_INPUTS, P_val, 0)
+            T_sat, h_l_sat = sat.T(), sat.hmass()
+            sat.update(CP.PQ_INPUTS, P_val, 1)
+            h_v_sat = sat.hmass()
+
+        # Tolerancias (ajustables según necesidad)
+        tol_temp = 0.1  # K
+        tol_enth = 100  # J/kg
+
+        # Determinar el estado basado en comparación con valores de saturación
+        if abs(T_val - T_sat) < tol_temp:
+            # Está en la curva de saturación
+            if q == 0.0:
+                return "Líquido saturado"
+            elif q == 1.0:
+                return "Vapor saturado"
+            return "Mezcla líquido-vapor"
+        # Está fuera de la curva de saturación
+        if h_val < h_l_sat - tol_enth:
+            return "Líquido subenfriado"
+        elif h_val > h_v_sat + tol_enth:
+            return "Vapor sobrecalentado"
+        # Está dentro de la campana pero no en la curva de saturación
+        return "Mezcla líquido-vapor"
+
+    except Exception:
+        pass
+
+    # Si falla el cálculo de saturación a P, intentar a T
+    try:
+        with pool_estados.prestar(fluid) as sat:
+            sat.update(CP.QT_INPUTS, 0, T_val)
+            P_sat, h_l_sat = sat.p(), sat.hmass()
+            sat.update(CP.QT_INPUTS, 1, T_val)
+            h_v_sat = sat.hmass()
+
+        # Tolerancias
+        tol_pres = 100  # Pa
+        tol_enth = 100  # J/kg
+
+        if abs(P_val - P_sat) < tol_pres:
+            # Está en la curva de saturación
+            if q == 0.0:
+                return "Líquido saturado"
+            elif q == 1.0:
+                return "Vapor saturado"
+            return "Mezcla líquido-vapor"
+        # Está fuera de la curva de saturación
+        if h_val < h_l_sat - tol_enth:
+            return "Líquido subenfriado"
+        elif h_val > h_v_sat + tol_enth:
+            return "Vapor sobrecalentado"
+        # Está dentro de la campana pero no en la curva de saturación
+        return "Mezcla líquido-vapor"
+
+    except Exception:
+        pass
+
+    # Si ambos métodos fallan, usar método simple basado en calidad
+    if q == 0.0:
+        return "Líquido"
+    elif q == 1.0:
+        return "Vapor"
+    return "Mezcla líquido-vapor"
+
+evaluadores = {
+    "T": lambda estado, fluid, obtener: estado.T(),
+    "P": lambda estado, fluid, obtener: estado.p(),
+    "h": lambda estado, fluid, obtener: estado.hmass(),
+    "s": lambda estado, fluid, obtener: estado.smass(),
+    "u": lambda estado, fluid, obtener: estado.umass(),
+    "rho": lambda estado, fluid, obtener: estado.rhomass(),
+    "x": calidad,
+    "v": lambda estado, fluid, obtener: 1.0 / obtener("rho"),
+    "vel_sonido": lambda estado, fluid, obtener: estado.speed_sound(),
+    "exergia": exergia,
+    "mu": lambda estado, fluid, obtener: estado.viscosity(),
+    "cp": lambda estado, fluid, obtener: estado.cpmass(),
+    "cv": lambda estado, fluid, obtener: estado.cvmass(),
+    "k": lambda estado, fluid, obtener: obtener("cp") / obtener("cv"),
+    "cond": lambda estado, fluid, obtener: estado.conductivity(),
+    "Pr": lambda estado, fluid, obtener: obtener("cp") * obtener("mu") / obtener("cond"),
+    "sigma": tension_superficial,
+    "kappa_T": lambda estado, fluid, obtener: estado.isothermal_compressibility(),
+    "beta": lambda estado, fluid, obtener: estado.isobaric_expansion_coefficient(),
+    "mu_JT": derivada_parcial("T", "P", "h"),
+    "dhdP_T": derivada_parcial("h", "P", "T"),
+    "Z": lambda estado, fluid, obtener: estado.compressibility_factor(),
+    "estado_termodinamico": estado_termodinamico,
+}
+
+# Orden en que se devuelven las salidas
+salidas_disponibles = list(to_return) + ["v"] + extra_props + ["estado_termodinamico"]
+# Lo que se calcula si no se indica otra cosa: todo salvo las propiedades de
+# transporte y superficie que se agregaron después (λ, Pr, σ) y las derivadas
+salidas_por_defecto = [k for k in salidas_disponibles
+                       if k not in ["cond", "Pr", "sigma"] + salidas_derivadas]
+
+def resolver_estado(estado, prop1, val1_SI, prop2, val2_SI, fluid):
+    """Resuelve el AbstractState `estado` con dos propiedades en SI.
+
+    Los pares nativos de CoolProp se resuelven con un único flash; el resto (o
+    un flash nativo que falla) con el solver de `inversion`.
+    """
+    # v se ingresa como volumen específico: el flash se hace con ρ = 1/v
+    if prop1 == "v":
+        prop1, val1_SI = "rho", 1.0 / val1_SI
+    if prop2 == "v":
+        prop2, val2_SI = "rho", 1.0 / val2_SI
+    inversion.resolver_par(estado, fluid, prop1, val1_SI, prop2, val2_SI)
+
+# === Función para calcular todas las propiedades ===
+def calcular_propiedades(prop1, val1_SI, prop2, val2_SI, fluid, salidas=None,
+                         T0=T0_defecto, P0=P0_defecto):
+    """Calcula las propiedades termodinámicas dadas dos propiedades.
+
+    `salidas` es la lista de propiedades a devolver (claves de
+    `salidas_disponibles`); por defecto `salidas_por_defecto`. Los valores
+    quedan en SI (se convierten a las unidades de salida al mostrarlos) y los
+    que no se pueden calcular quedan en None. `T0`, `P0` son el estado de
+    referencia de la exergía.
+    """
+    if salidas is None:
+        salidas = salidas_por_defecto
+    try:
+        # El AbstractState se toma prestado del pool compartido y se devuelve
+        # recién después de leer todas las salidas (si el cálculo falla, el
+        # pool lo descarta)
+        with pool_estados.prestar(fluid) as estado:
+            resolver_estado(estado, prop1, val1_SI, prop2, val2_SI, fluid)
+            return leer_salidas(estado, fluid, salidas, T0, P0)
+    except Exception:
+        # Par sin solución o fluido que CoolProp no reconoce
+        return leer_salidas(None, fluid, salidas, T0, P0)
+
+def leer_salidas(estado, fluid, salidas, T0=T0_defecto, P0=P0_defecto):
+    """Evalúa las `salidas` pedidas sobre un estado resuelto (None si el flash falló)."""
+    valores_SI = {"T0": T0, "P0": P0}
+    def obtener(k):
+        if k not in valores_SI:
+            valores_SI[k] = None  # evita recursión si una dependencia falla
+            if estado is not None:
+                try:
+                    valores_SI[k] = evaluadores[k](estado, fluid, obtener)
+                except Exception:
+                    valores_SI[k] = None
+        return valores_SI[k]
+
+    results = {}
+    for k in salidas_disponibles:
+        if k not in salidas:
+            continue
+        raw = obtener(k)
+        if k != "estado_termodinamico" or raw is not None:
+            results[k] = raw
+    return results
@@ -0,0 +1,422 @@
+"""
+Prueba de carga del Atlas Termodinámico Digital.
+
+Levanta un único servidor `streamlit run app.py` (o usa uno ya desplegado con
+`--url`) y le conecta N sesiones concurrentes por el mismo websocket que usa
+el navegador. Así las sesiones compiten por lo mismo que en producción: el
+GIL del servidor, el pool de AbstractState, `st.cache_data`/`cache_resource`
+y el pool de procesos compartido.
+
+Cada sesión es un hilo con un cliente mínimo del protocolo de Streamlit: lee
+los widgets de cada run y, como el navegador, reenvía sus valores con cada
+interacción. El guion es realista: cambiar de fluido, elegir un par y sus
+valores y pulsar "Calcular", abrir "Mostrar Gráfico" y cambiar el diagrama, y
+alternar el sistema de unidades. Cada interacción es un rerun y todos se
+miden.
+
+Al final informa la latencia de rerun (p50/p95/p99), total y por acción, y el
+CPU que consumió el proceso del servidor (solo en Linux y con el servidor
+propio). Requiere el paquete `websockets` (viene con Streamlit 1.66, la
+versión con la que se probó).
+
+Uso:
+    python prueba_carga.py --sesiones 8 --acciones 25
+    python prueba_carga.py --sesiones 16 --json resultados.json
+    python prueba_carga.py --sesiones 16 --url http://localhost:8501
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.sync.client import connect
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# === Guion de acciones ===
+fluidos_guion = ["Agua", "R134a", "Aire", "Dióxido de Carbono", "Amoníaco", "R410A", "Nitrógeno"]
+
+# (prop1, valor1, prop2, valor2) en las unidades de entrada por defecto
+pares_guion = [
+    ("T", "25.0", "P", "101325.0"),
+    ("P", "101325.0", "x", "0.5"),
+    ("T", "100.0", "x", "1"),
+    ("P", "500000.0", "h", "2800"),
+    ("P", "1000000.0", "s", "6.5"),
+    ("T", "150.0", "P", "200000.0"),
+    ("T", "25.0", "h", "104.9"),
+]
+
+diagramas_guion = ["T vs S", "P vs v"]
+sistemas_guion = ["Ninguno", "SI", "Imperial"]
+
+# Peso relativo de cada acción en el guion
+pesos_acciones = {
+    "calcular": 5,
+    "fluido": 2,
+    "grafico": 2,
+    "unidades": 1,
+}
+
+# Widgets que usa el guion y el campo de WidgetState con su valor
+campos_widgets = {
+    "selectbox": "string_value",
+    "radio": "string_value",
+    "text_input": "string_value",
+    "checkbox": "bool_value",
+    "expander": "bool_value",
+}
+
+
+# === Cliente de una sesión ===
+def conectar(url, timeout):
+    """Websocket de una sesión nueva, igual al que abre el navegador."""
+    return connect(url.replace("http", "ws", 1) + "/_stcore/stream", subprotocols=["streamlit"],
+                   max_size=None, open_timeout=timeout)
+
+
+class Sesion:
+    """Una pestaña del navegador: guarda los widgets del último run y los
+    valores que cambió el usuario, y los reenvía en cada rerun."""
+
+    def __init__(self, ws, timeout):
+        self.ws = ws
+        self.timeout = timeout
+        self.pagina = ""
+        self.widgets = []   # (tipo, proto) del último run, en orden de aparición
+        self.estados = {}   # id -> WidgetState de los valores cambiados
+        self.excepcion = False
+
+    def run(self, disparar=None):
+        """Pide un rerun con los valores actuales (y el botón `disparar`
+        pulsado) y espera a que termine. Devuelve la latencia en segundos."""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = self.pagina
+        msg.rerun_script.widget_states.widgets.extend(self.estados.values())
+        if disparar is not None:
+            msg.rerun_script.widget_states.widgets.append(WidgetState(id=disparar.id, trigger_value=True))
+
+        inicio = time.perf_counter()
+        self.ws.send(msg.SerializeToString())
+        widgets, excepcion = [], False
+        while True:
+            f = ForwardMsg()
+            f.ParseFromString(self.ws.recv(timeout=self.timeout))
+            tipo = f.WhichOneof("type")
+            if tipo == "new_session":
+                self.pagina = f.new_session.page_script_hash
+            elif tipo == "delta":
+                delta = f.delta
+                if delta.WhichOneof("type") == "new_element":
+                    elemento = delta.new_element.WhichOneof("type")
+                    if elemento == "exception":
+                        excepcion = True
+                    elif elemento in campos_widgets or elemento == "button":
+                        widgets.append((elemento, getattr(delta.new_element, elemento)))
+                elif delta.WhichOneof("type") == "add_block" and delta.add_block.HasField("expandable"):
+                    widgets.append(("expander", delta.add_block.expandable))
+            elif tipo == "script_finished":
+                if f.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    excepcion = True
+                # Un st.rerun() del propio script sigue con otro run
+                if f.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+        latencia = time.perf_counter() - inicio
+
+        self.widgets, self.excepcion = widgets, excepcion
+        # Como el navegador, se olvidan los widgets que ya no están en pantalla
+        # y se adoptan los valores que el script fijó por session_state
+        ids = {w.id for _, w in widgets}
+        self.estados = {i: e for i, e in self.estados.items() if i in ids}
+        for tipo, w in widgets:
+            if getattr(w, "set_value", False):
+                self.estados[w.id] = self._estado(tipo, w, self._valor_proto(tipo, w))
+        return latencia
+
+    def buscar(self, tipo, etiqueta):
+        """Widgets de `tipo` cuya etiqueta empieza por `etiqueta`."""
+        return [w for t, w in self.widgets if t == tipo and w.label.startswith(etiqueta) and w.id]
+
+    def widget(self, tipo, etiqueta):
+        encontrados = self.buscar(tipo, etiqueta)
+        if not encontrados:
+            raise LookupError(f"No se encontró el widget '{etiqueta}'")
+        return encontrados[0]
+
+    @staticmethod
+    def _valor_proto(tipo, w):
+        """Valor del widget según el proto: el fijado por el script o el
+        valor por defecto."""
+        if tipo in ("selectbox", "radio"):
+            if w.set_value and w.HasField("raw_value"):
+                return w.raw_value
+            return w.options[w.default] if w.HasField("default") else None
+        if tipo == "text_input" and w.set_value and w.HasField("value"):
+            return w.value
+        if tipo == "expander":
+            return w.expanded
+        return w.default
+
+    @staticmethod
+    def _estado(tipo, w, valor):
+        estado = WidgetState(id=w.id)
+        if valor is not None:
+            setattr(estado, campos_widgets[tipo], valor)
+        return estado
+
+    def valor(self, tipo, w):
+        """Valor que muestra el widget `w`."""
+        if w.id in self.estados:
+            estado = self.estados[w.id]
+            campo = campos_widgets[tipo]
+            return getattr(estado, campo) if estado.HasField(campo) else None
+        return self._valor_proto(tipo, w)
+
+    def fijar(self, tipo, w, valor):
+        """Cambia el valor de `w` y, si cambió, hace el rerun que haría el
+        navegador. Devuelve la latencia o None si no hubo rerun."""
+        if self.valor(tipo, w) == valor:
+            return None
+        self.estados[w.id] = self._estado(tipo, w, valor)
+        return self.run()
+
+
+# === Acciones ===
+# Cada acción devuelve la latencia de cada rerun que provocó
+def accion_calcular(sesion, rng):
+    prop1, val1, prop2, val2 = rng.choice(pares_guion)
+    latencias = [sesion.fijar("selectbox", sesion.widget("selectbox", "Propiedad 1"), prop1),
+                 sesion.fijar("selectbox", sesion.widget("selectbox", "Propiedad 2"), prop2)]
+    valores = sesion.buscar("text_input", "Valor")
+    latencias.append(sesion.fijar("text_input", valores[0], val1))
+    valores = sesion.buscar("text_input", "Valor")
+    latencias.append(sesion.fijar("text_input", valores[1], val2))
+    latencias.append(sesion.run(disparar=sesion.widget("button", "Calcular")))
+    return latencias
+
+
+def accion_fluido(sesion, rng):
+    return [sesion.fijar("selectbox", sesion.widget("selectbox", "Selecciona el fluido"), rng.choice(fluidos_guion))]
+
+
+def accion_grafico(sesion, rng):
+    # El gráfico se construye solo con el expander abierto: abrirlo es la
+    # primera acción, después se alterna el diagrama
+    diagramas = sesion.buscar("selectbox", "Selecciona diagrama")
+    if not diagramas:
+        return [sesion.fijar("expander", sesion.widget("expander", "Mostrar Gráfico"), True)]
+    w = diagramas[0]
+    actual = sesion.valor("selectbox", w)
+    return [sesion.fijar("selectbox", w, diagramas_guion[1] if actual == diagramas_guion[0] else diagramas_guion[0])]
+
+
+def accion_unidades(sesion, rng):
+    return [sesion.fijar("radio", sesion.widget("radio", "Sistema de unidades"), rng.choice(sistemas_guion))]
+
+
+acciones = {
+    "calcular": accion_calcular,
+    "fluido": accion_fluido,
+    "grafico": accion_grafico,
+    "unidades": accion_unidades,
+}
+
+
+# === Sesión simulada ===
+def ejecutar_sesion(url, n_acciones, semilla, timeout, barrera, registro):
+    rng = random.Random(semilla)
+    try:
+        barrera.wait(timeout)
+        with conectar(url, timeout) as ws:
+            sesion = Sesion(ws, timeout)
+            registro["arranque"] = sesion.run()
+            nombres = list(pesos_acciones)
+            pesos = [pesos_acciones[a] for a in nombres]
+            for _ in range(n_acciones):
+                accion = rng.choices(nombres, weights=pesos)[0]
+                try:
+                    for latencia in acciones[accion](sesion, rng):
+                        if latencia is None:
+                            continue
+                        registro["reruns"].append((accion, latencia))
+                        if sesion.excepcion:
+                            registro["errores"] += 1
+                except Exception:
+                    registro["errores"] += 1
+    except Exception:
+        registro["errores"] += 1
+
+
+# === Servidor ===
+def iniciar_servidor(timeout):
+    """Levanta `streamlit run app.py` sin interfaz en un puerto libre y espera
+    a que responda. Devuelve (proceso, url)."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.headless=true",
+         f"--server.port={puerto}", "--server.address=127.0.0.1", "--browser.gatherUsageStats=false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{puerto}"
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError("El servidor de Streamlit terminó al arrancar")
+        try:
+            with urllib.request.urlopen(url + "/_stcore/health", timeout=1) as r:
+                if r.read() == b"ok":
+                    return proceso, url
+        except OSError:
+            time.sleep(0.2)
+    proceso.terminate()
+    raise RuntimeError("El servidor de Streamlit no respondió a tiempo")
+
+
+def cpu_proceso(pid):
+    """CPU (usuario + sistema) consumido por el proceso `pid`, en segundos.
+    Se lee de /proc, así que fuera de Linux devuelve None."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            campos = f.read().rsplit(")", 1)[1].split()
+        return (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def percentiles(valores):
+    if not valores:
+        return {"n": 0}
+    arr = np.asarray(valores) * 1000.0
+    return {
+        "n": len(valores),
+        "media_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "max_ms": float(arr.max()),
+    }
+
+
+def prueba_carga(sesiones, n_acciones, semilla=0, timeout=120.0, url=None):
+    """Lanza `sesiones` sesiones concurrentes contra un servidor y devuelve
+    el resumen de métricas. Sin `url` levanta un servidor propio."""
+    proceso = None
+    if url is None:
+        proceso, url = iniciar_servidor(timeout)
+    try:
+        # Un primer run fuera de la medición: compila app.py y carga CoolProp,
+        # como en un servidor que ya estaba atendiendo
+        with conectar(url, timeout) as ws:
+            Sesion(ws, timeout).run()
+
+        resultados = {f"sesion-{i+1}": {"arranque": None, "reruns": [], "errores": 0} for i in range(sesiones)}
+        barrera = threading.Barrier(sesiones + 1)
+        hilos = [
+            threading.Thread(target=ejecutar_sesion, name=nombre,
+                             args=(url, n_acciones, semilla + i, timeout, barrera, registro))
+            for i, (nombre, registro) in enumerate(resultados.items())
+        ]
+        for h in hilos:
+            h.start()
+        cpu_inicio = cpu_proceso(proceso.pid) if proceso else None
+        barrera.wait(timeout)
+        inicio = time.perf_counter()
+        for h in hilos:
+            h.join()
+        duracion = time.perf_counter() - inicio
+        cpu_fin = cpu_proceso(proceso.pid) if proceso else None
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout)
+
+    todas = [lat for r in resultados.values() for _, lat in r["reruns"]]
+    por_accion = defaultdict(list)
+    for r in resultados.values():
+        for accion, lat in r["reruns"]:
+            por_accion[accion].append(lat)
+
+    por_sesion = {}
+    for nombre, r in resultados.items():
+        latencias = percentiles([lat for _, lat in r["reruns"]])
+        por_sesion[nombre] = {
+            "arranque_ms": (r["arranque"] or 0.0) * 1000.0,
+            "reruns": len(r["reruns"]),
+            "errores": r["errores"],
+            "p50_ms": latencias.get("p50_ms"),
+            "p95_ms": latencias.get("p95_ms"),
+        }
+
+    cpu = cpu_fin - cpu_inicio if cpu_inicio is not None and cpu_fin is not None else None
+    n_runs = len(todas) + sum(r["arranque"] is not None for r in resultados.values())
+    return {
+        "sesiones": sesiones,
+        "acciones_por_sesion": n_acciones,
+        "duracion_s": duracion,
+        "cpu_servidor_s": cpu,
+        "cpu_por_rerun_ms": cpu / n_runs * 1000.0 if cpu is not None and n_runs else None,
+        "reruns_por_s": len(todas) / duracion if duracion > 0 else 0.0,
+        "arranque": percentiles([r["arranque"] for r in resultados.values() if r["arranque"] is not None]),
+        "latencia": percentiles(todas),
+        "latencia_por_accion": {a: percentiles(v) for a, v in sorted(por_accion.items())},
+        "por_sesion": por_sesion,
+    }
+
+
+def imprimir_resumen(resumen):
+    def fila(nombre, p):
+        if not p.get("n"):
+            return f"{nombre:<12} sin datos"
+        return (f"{nombre:<12} n={p['n']:<5} p50={p['p50_ms']:8.1f} ms  p95={p['p95_ms']:8.1f} ms  "
+                f"p99={p['p99_ms']:8.1f} ms  max={p['max_ms']:8.1f} ms")
+
+    print(f"Sesiones: {resumen['sesiones']}  acciones/sesión: {resumen['acciones_por_sesion']}")
+    cpu = resumen["cpu_servidor_s"]
+    cpu_texto = (f"CPU servidor: {cpu:.1f} s ({resumen['cpu_por_rerun_ms']:.1f} ms/rerun)"
+                 if cpu is not None else "CPU servidor: no disponible")
+    print(f"Duración: {resumen['duracion_s']:.1f} s  {cpu_texto}  reruns/s: {resumen['reruns_por_s']:.2f}")
+    print()
+    print(fila("arranque", resumen["arranque"]))
+    print(fila("rerun", resumen["latencia"]))
+    for accion, p in resumen["latencia_por_accion"].items():
+        print(fila(f"  {accion}", p))
+    print()
+    print(f"{'sesión':<12} {'reruns':>6} {'errores':>7} {'p50 [ms]':>9} {'p95 [ms]':>9}")
+    for nombre, s in resumen["por_sesion"].items():
+        p50 = f"{s['p50_ms']:9.1f}" if s["p50_ms"] is not None else f"{'-':>9}"
+        p95 = f"{s['p95_ms']:9.1f}" if s["p95_ms"] is not None else f"{'-':>9}"
+        print(f"{nombre:<12} {s['reruns']:>6} {s['errores']:>7} {p50} {p95}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga con sesiones Streamlit concurrentes")
+    parser.add_argument("--sesiones", type=int, default=4, help="Número de sesiones concurrentes")
+    parser.add_argument("--acciones", type=int, default=20, help="Acciones por sesión")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla de los guiones aleatorios")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Timeout por rerun [s]")
+    parser.add_argument("--url", help="Servidor ya levantado (por defecto se levanta uno propio)")
+    parser.add_argument("--json", help="Guardar el resumen en este archivo JSON")
+    args = parser.parse_args()
+
+    resumen = prueba_carga(args.sesiones, args.acciones, args.semilla, args.timeout, args.url)
+    imprimir_resumen(resumen)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resumen, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()